@@ -0,0 +1,272 @@
+import argparse
+import json
+import math
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+# Models of cumulative cost y(n) after n documents. All are linear in their parameters (the power
+# law after taking logs), so each is fitted by ordinary least squares on its design matrix.
+MODELS: Dict[str, Dict[str, Any]] = {
+    "linear": {"terms": ("1", "n"), "design": lambda n: np.column_stack([np.ones_like(n), n])},
+    "nlogn": {"terms": ("1", "n log n"), "design": lambda n: np.column_stack([np.ones_like(n), n * np.log(n)])},
+    "quadratic": {"terms": ("1", "n", "n^2"), "design": lambda n: np.column_stack([np.ones_like(n), n, n ** 2])},
+    # log y = log a + b log n
+    "power": {"terms": ("log a", "b"), "design": lambda n: np.column_stack([np.ones_like(n), np.log(n)]), "log": True},
+}
+
+METRICS = {
+    "time": ("total_indexing_time_s", "s"),
+    "memory": ("peak_rss_mb", "MB"),
+}
+
+
+@dataclass
+class Fit:
+    model: str
+    params: np.ndarray
+    ci_low: np.ndarray
+    ci_high: np.ndarray
+    aicc: float
+    rss: float
+    points: int
+    _cov: np.ndarray
+    _sigma2: float
+    _dof: int
+
+    def predict(self, n: float, confidence: float = 0.95) -> Tuple[float, float, float]:
+        """(prediction, lower, upper) of a new observation at `n`."""
+        spec = MODELS[self.model]
+        x = spec["design"](np.array([float(n)]))[0]
+        mean = float(x @ self.params)
+        if self._dof > 0:
+            half = stats.t.ppf(0.5 + confidence / 2, self._dof) * math.sqrt(self._sigma2 * (1.0 + x @ self._cov @ x))
+        else:
+            half = float("inf")
+        if spec.get("log"):
+            return math.exp(mean), math.exp(mean - half), math.exp(min(mean + half, 700.0))
+        return mean, mean - half, mean + half
+
+    def describe(self) -> str:
+        terms = MODELS[self.model]["terms"]
+        return ", ".join(f"{t}={p:.4g} [{lo:.4g}, {hi:.4g}]"
+                         for t, p, lo, hi in zip(terms, self.params, self.ci_low, self.ci_high))
+
+
+def metric_value(record: Dict[str, Any], metric: str) -> Optional[float]:
+    key = METRICS[metric][0]
+    if metric == "memory":
+        return (record.get("memory") or {}).get(key)
+    return record.get(key)
+
+
+def run_label(record: Dict[str, Any]) -> str:
+    """Runs are told apart by their `tag` when records carry one, otherwise by indexing strategy."""
+    return record.get("tag") or record.get("indexing_strategy") or "default"
+
+
+def load_runs(paths: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Completed steps of every results file, grouped by run and sorted by document count."""
+    runs: Dict[str, List[Dict[str, Any]]] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        for record in records:
+            if record.get("stopped_reason"):
+                continue # Partial step cut short by the memory guard
+            label = run_label(record)
+            if len(paths) > 1:
+                label = f"{Path(path).stem}:{label}"
+            runs.setdefault(label, []).append(record)
+    for records in runs.values():
+        records.sort(key=lambda r: r["document_count"])
+    return runs
+
+
+def series(records: Sequence[Dict[str, Any]], metric: str) -> Tuple[np.ndarray, np.ndarray]:
+    points = [(r["document_count"], metric_value(r, metric)) for r in records]
+    points = [(n, y) for n, y in points if y is not None and n > 0]
+    n = np.array([p[0] for p in points], dtype=float)
+    y = np.array([p[1] for p in points], dtype=float)
+    return n, y
+
+
+def marginal_costs(n: np.ndarray, y: np.ndarray) -> List[Dict[str, float]]:
+    """Cost per document added in each step, between consecutive document counts."""
+    steps = []
+    for i in range(1, len(n)):
+        added = n[i] - n[i - 1]
+        if added > 0:
+            steps.append({"from": float(n[i - 1]), "to": float(n[i]), "per_document": float((y[i] - y[i - 1]) / added)})
+    return steps
+
+
+def fit_model(model: str, n: np.ndarray, y: np.ndarray, confidence: float = 0.95) -> Optional[Fit]:
+    spec = MODELS[model]
+    if spec.get("log"):
+        if np.any(y <= 0):
+            return None
+        target = np.log(y)
+    else:
+        target = y
+    X = spec["design"](n)
+    k = X.shape[1]
+    if len(n) <= k:
+        return None
+    params, *_ = np.linalg.lstsq(X, target, rcond=None)
+    dof = len(n) - k
+    residuals = target - X @ params
+    sigma2 = float(residuals @ residuals) / dof
+    cov = np.linalg.pinv(X.T @ X)
+    se = np.sqrt(np.maximum(np.diag(cov) * sigma2, 0.0))
+    half = stats.t.ppf(0.5 + confidence / 2, dof) * se
+
+    # Compare models on the original scale so the power law's log fit is not favoured
+    fitted = np.exp(X @ params) if spec.get("log") else X @ params
+    rss = float(np.sum((y - fitted) ** 2))
+    m = len(n)
+    aic = m * math.log(max(rss, 1e-300) / m) + 2 * k
+    aicc = aic + (2 * k * (k + 1) / (m - k - 1) if m - k - 1 > 0 else float("inf"))
+    return Fit(model, params, params - half, params + half, aicc, rss, m, cov, sigma2, dof)
+
+
+def fit_all(n: np.ndarray, y: np.ndarray, confidence: float = 0.95) -> List[Fit]:
+    """Every model that can be fitted, best (lowest AICc) first."""
+    fits = [fit_model(model, n, y, confidence) for model in MODELS]
+    return sorted((f for f in fits if f is not None), key=lambda f: f.aicc)
+
+
+def analyze_run(records: Sequence[Dict[str, Any]], metric: str, target: Optional[int],
+                confidence: float = 0.95) -> Dict[str, Any]:
+    n, y = series(records, metric)
+    fits = fit_all(n, y, confidence)
+    result: Dict[str, Any] = {
+        "metric": metric,
+        "points": len(n),
+        "marginal_costs": marginal_costs(n, y),
+        "fits": [{"model": f.model, "aicc": f.aicc, "params": f.params.tolist(),
+                  "ci_low": f.ci_low.tolist(), "ci_high": f.ci_high.tolist()} for f in fits],
+        "best_model": fits[0].model if fits else None,
+    }
+    if fits and target:
+        prediction, low, high = fits[0].predict(target, confidence)
+        result["extrapolation"] = {"document_count": target, "prediction": prediction, "low": low, "high": high}
+    return result
+
+
+def print_analysis(label: str, analysis: Dict[str, Any], fits: List[Fit]) -> None:
+    unit = METRICS[analysis["metric"]][1]
+    print(f"\n=== {label}: {analysis['metric']} ({analysis['points']} points) ===")
+    if analysis["marginal_costs"]:
+        print("Marginal cost per document:")
+        for step in analysis["marginal_costs"]:
+            print(f"  {step['from']:>8.0f} -> {step['to']:<8.0f} {step['per_document']:10.3f} {unit}/doc")
+    if not fits:
+        print("Not enough points to fit any model.")
+        return
+    print("Models (best first, by AICc):")
+    best_aicc = fits[0].aicc
+    for f in fits:
+        print(f"  {f.model:>9}  dAICc={f.aicc - best_aicc:8.2f}  {f.describe()}")
+    if "extrapolation" in analysis:
+        e = analysis["extrapolation"]
+        print(f"Extrapolated to {e['document_count']} documents ({analysis['best_model']}): "
+              f"{e['prediction']:.1f} {unit} [{e['low']:.1f}, {e['high']:.1f}]")
+
+
+def compare_runs(baseline: Sequence[Dict[str, Any]], candidate: Sequence[Dict[str, Any]], metric: str,
+                 tolerance: float = 0.05, alpha: float = 0.05) -> Dict[str, Any]:
+    """
+    Test whether `candidate` costs more per document than `baseline`.
+
+    Per-step marginal costs are paired by step (same document counts in both
+    runs) and a one-sided t-test is run on their log ratios against
+    log(1 + tolerance). The power-law exponents are compared as well; their
+    intervals not overlapping is reported as a scaling change.
+    """
+    base_steps = {(s["from"], s["to"]): s["per_document"] for s in marginal_costs(*series(baseline, metric))}
+    cand_steps = {(s["from"], s["to"]): s["per_document"] for s in marginal_costs(*series(candidate, metric))}
+    common = [k for k in sorted(base_steps) if k in cand_steps and base_steps[k] > 0 and cand_steps[k] > 0]
+    log_ratios = np.array([math.log(cand_steps[k] / base_steps[k]) for k in common])
+
+    result: Dict[str, Any] = {"metric": metric, "paired_steps": len(common), "tolerance": tolerance, "alpha": alpha}
+    if len(log_ratios) >= 2:
+        test = stats.ttest_1samp(log_ratios, math.log(1.0 + tolerance), alternative="greater")
+        result.update({
+            "mean_ratio": float(np.exp(log_ratios.mean())),
+            "p_value": float(test.pvalue),
+            "regression": bool(test.pvalue < alpha),
+        })
+    else:
+        result.update({"mean_ratio": float(np.exp(log_ratios.mean())) if len(log_ratios) else None,
+                       "p_value": None, "regression": False})
+
+    exponents = {}
+    for name, records in (("baseline", baseline), ("candidate", candidate)):
+        power = fit_model("power", *series(records, metric), confidence=1 - alpha)
+        if power is not None:
+            exponents[name] = (float(power.params[1]), float(power.ci_low[1]), float(power.ci_high[1]))
+    result["exponents"] = exponents
+    result["scaling_regression"] = bool(len(exponents) == 2 and exponents["candidate"][1] > exponents["baseline"][2])
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fit scaling models to experiment results and flag regressions")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = sub.add_parser("fit", help="Fit complexity models and extrapolate")
+    fit_parser.add_argument("results", nargs="+", help="Results JSON files written by experiment.py")
+    fit_parser.add_argument("--metric", choices=sorted(METRICS), action="append",
+                            help="Metric(s) to analyze (default: time and memory)")
+    fit_parser.add_argument("--target", type=int, help="Document count to extrapolate to")
+    fit_parser.add_argument("--confidence", type=float, default=0.95)
+    fit_parser.add_argument("--json", help="Also write the analysis to this file")
+
+    compare_parser = sub.add_parser("compare", help="Exit with 1 if the candidate run regresses")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--run", help="Run label to compare when a file holds several (tag or strategy)")
+    compare_parser.add_argument("--metric", choices=sorted(METRICS), default="time")
+    compare_parser.add_argument("--tolerance", type=float, default=0.05, help="Slowdown per document that is accepted")
+    compare_parser.add_argument("--alpha", type=float, default=0.05, help="Significance level")
+    args = parser.parse_args(argv)
+
+    if args.command == "fit":
+        output = {}
+        for label, records in load_runs(args.results).items():
+            for metric in args.metric or ["time", "memory"]:
+                n, y = series(records, metric)
+                if len(n) == 0:
+                    continue
+                analysis = analyze_run(records, metric, args.target, args.confidence)
+                print_analysis(label, analysis, fit_all(n, y, args.confidence))
+                output.setdefault(label, {})[metric] = analysis
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(output, f, indent=2)
+        return 0
+
+    runs = []
+    for path in (args.baseline, args.candidate):
+        by_label = load_runs([path])
+        label = args.run or next(iter(by_label), None)
+        if label not in by_label:
+            print(f"Error: no run '{label}' in {path} (found {sorted(by_label)})")
+            return 2
+        runs.append(by_label[label])
+    result = compare_runs(runs[0], runs[1], args.metric, args.tolerance, args.alpha)
+    print(json.dumps(result, indent=2))
+    if result["regression"] or result["scaling_regression"]:
+        print(f"REGRESSION: candidate {args.metric} per document is significantly worse than baseline.")
+        return 1
+    print("No significant regression.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from hipporag.utils.misc_utils import QuerySolution
+
+
+def batch_min_max_normalize(scores: np.ndarray) -> np.ndarray:
+    """Column-wise version of HippoRAG's `min_max_normalize` (constant columns become ones)."""
+    min_vals = scores.min(axis=0, keepdims=True)
+    ranges = scores.max(axis=0, keepdims=True) - min_vals
+    normalized = np.ones_like(scores)
+    np.divide(scores - min_vals, ranges, out=normalized, where=ranges != 0)
+    return normalized
+
+
+def batch_scores(embeddings: np.ndarray, query_embeddings: Sequence[np.ndarray]) -> np.ndarray:
+    """(#rows, #queries) normalized similarities from a single matrix product."""
+    queries = np.vstack([np.reshape(q, (1, -1)) for q in query_embeddings])
+    return batch_min_max_normalize(np.dot(embeddings, queries.T))
+
+
+def batched_retrieve(rag: Any, queries: List[str], num_to_retrieve: Optional[int] = None) -> List[QuerySolution]:
+    """
+    Same results as `HippoRAG.retrieve(queries)`, with the per-query similarity work batched.
+
+    Query embeddings come from one `get_query_embeddings` call, and fact and
+    passage scores for the whole batch come from one matrix product each
+    instead of one `np.dot` per query. Fact reranking and the graph search
+    still run per query, and so does PPR unless the sparse PPR engine is
+    installed, which then solves the whole batch at once. While the batch runs,
+    the instance's `dense_passage_retrieval` answers from the precomputed
+    passage scores, so calls must not overlap with other retrievals on the same
+    instance.
+    """
+    if num_to_retrieve is None:
+        num_to_retrieve = rag.global_config.retrieval_top_k
+    if not rag.ready_to_retrieve:
+        rag.prepare_retrieval_objects()
+
+    rag.get_query_embeddings(queries)
+    if len(rag.fact_embeddings) > 0:
+        fact_scores = batch_scores(rag.fact_embeddings, [rag.query_to_embedding['triple'][q] for q in queries])
+    else:
+        fact_scores = None
+    passage_scores = batch_scores(rag.passage_embeddings, [rag.query_to_embedding['passage'][q] for q in queries])
+
+    dpr_results = {}
+    for i, query in enumerate(queries):
+        scores = passage_scores[:, i]
+        sorted_doc_ids = np.argsort(scores)[::-1]
+        dpr_results[query] = (sorted_doc_ids, scores[sorted_doc_ids])
+
+    # Keep whatever is installed on the instance (e.g. a profiler wrapper) to restore it afterwards
+    instance_dpr = rag.__dict__.get("dense_passage_retrieval")
+    fallback_dpr = rag.dense_passage_retrieval
+    rag.dense_passage_retrieval = lambda query: dpr_results[query] if query in dpr_results else fallback_dpr(query)
+    # With the sparse PPR engine installed, the graph searches only collect their reset vectors
+    # and PageRank runs once for the whole batch
+    engine = getattr(rag, "sparse_ppr", None)
+    try:
+        rankings = []
+        graph_queries = []
+        with engine.deferred(rag) if engine is not None else nullcontext() as pending_resets:
+            for i, query in enumerate(queries):
+                query_fact_scores = fact_scores[:, i] if fact_scores is not None else np.array([])
+                top_k_fact_indices, top_k_facts, _ = rag.rerank_facts(query, query_fact_scores)
+
+                if len(top_k_facts) == 0:
+                    rankings.append(dpr_results[query])
+                else:
+                    rankings.append(rag.graph_search_with_fact_entities(
+                        query=query,
+                        link_top_k=rag.global_config.linking_top_k,
+                        query_fact_scores=query_fact_scores,
+                        top_k_facts=top_k_facts,
+                        top_k_fact_indices=top_k_fact_indices,
+                        passage_node_weight=rag.global_config.passage_node_weight,
+                    ))
+                    graph_queries.append(i)
+        if engine is not None:
+            for i, ranking in zip(graph_queries, engine.solve_deferred(rag, pending_resets)):
+                rankings[i] = ranking
+
+        results = []
+        for query, (sorted_doc_ids, sorted_doc_scores) in zip(queries, rankings):
+            top_k_docs = [rag.chunk_embedding_store.get_row(rag.passage_node_keys[idx])["content"]
+                          for idx in sorted_doc_ids[:num_to_retrieve]]
+            results.append(QuerySolution(question=query, docs=top_k_docs, doc_scores=sorted_doc_scores[:num_to_retrieve]))
+        return results
+    finally:
+        if instance_dpr is not None:
+            rag.dense_passage_retrieval = instance_dpr
+        else:
+            del rag.dense_passage_retrieval
+
+
+def measure_batch_sizes(rag: Any, queries: Sequence[str], batch_sizes: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    Amortized retrieval cost per query for each batch size.
+
+    Every batch size gets its own consecutive slice of `queries` (len(queries)
+    should be a multiple of the sizes), because HippoRAG keeps query embeddings
+    across calls and repeated questions would look artificially cheap.
+
+    HippoRAG's `index()` leaves `ready_to_retrieve` set, so after indexing the
+    caller has to reset it; the rebuild then happens here, before any batch is
+    timed, instead of measuring against the index as it was first prepared.
+    """
+    if not rag.ready_to_retrieve:
+        rag.prepare_retrieval_objects()
+    results = []
+    offset = 0
+    per_size = len(queries) // max(len(batch_sizes), 1)
+    for batch_size in batch_sizes:
+        size_queries = list(queries[offset:offset + per_size])
+        offset += per_size
+        batch_times = []
+        errors = 0
+        for start in range(0, len(size_queries), batch_size):
+            batch = size_queries[start:start + batch_size]
+            batch_start = time.perf_counter()
+            try:
+                batched_retrieve(rag, batch)
+            except Exception as e:
+                errors += 1
+                print(f"Error in retrieval batch of {len(batch)}: {e}")
+            batch_times.append(time.perf_counter() - batch_start)
+
+        total = sum(batch_times)
+        results.append({
+            "batch_size": batch_size,
+            "queries": len(size_queries),
+            "batches": len(batch_times),
+            "failed_batches": errors,
+            "total_s": total,
+            "per_batch_ms": 1000.0 * total / len(batch_times) if batch_times else 0.0,
+            "per_query_ms": 1000.0 * total / len(size_queries) if size_queries else 0.0,
+        })
+    return results
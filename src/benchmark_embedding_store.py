@@ -0,0 +1,89 @@
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# Add src to python path to allow imports
+src_path = Path(__file__).parent
+sys.path.append(str(src_path))
+
+from memory_tracking import MB
+from patches.quantized_store import QuantizedEmbeddingStore
+
+
+def synthetic_embeddings(rows: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors drawn around a few hundred topics, so neighbourhoods are not uniform noise."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(rows // 50, 1), dim)).astype(np.float32)
+    vectors = topics[rng.integers(0, len(topics), rows)] + 0.5 * rng.normal(size=(rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def traced(build):
+    """(result, traced bytes still allocated after `build`)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Top-k row indices per column of a (#rows, #queries) score matrix."""
+    return np.argpartition(-scores, k - 1, axis=0)[:k].T
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and recall of the quantized embedding store vs the default one")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536) # text-embedding-3-small
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.rows, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, args.rows, args.queries)] + 0.1 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    hash_ids = [f"chunk-{i}" for i in range(args.rows)]
+    texts = [f"text {i}" for i in range(args.rows)]
+
+    def build_default():
+        # The parquet store holds one array per row, and prepare_retrieval_objects stacks them into a dense copy
+        rows = list(vectors.astype(np.float64))
+        return rows, np.array(rows)
+
+    (rows_list, dense), default_bytes = traced(build_default)
+    start = time.perf_counter()
+    exact = dense.astype(np.float32) @ queries.T
+    default_ms = 1000.0 * (time.perf_counter() - start) / args.queries
+    expected = top_k(exact, args.k)
+    print(f"{'default':>8}: {default_bytes / MB:9.1f} MB in RAM, {default_ms:.3f} ms/query")
+    del rows_list, dense
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for dtype in ("float16", "int8"):
+            def build():
+                store = QuantizedEmbeddingStore(None, f"{tmp_dir}/{dtype}", 16, "chunk", dtype=dtype)
+                store._upsert(hash_ids, texts, vectors)
+                return store
+            store, store_bytes = traced(build)
+            start = time.perf_counter()
+            scores = store.matrix().dot(queries.T)
+            query_ms = 1000.0 * (time.perf_counter() - start) / args.queries
+            found = top_k(scores, args.k)
+            recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(expected, found)])
+            print(f"{dtype:>8}: {store_bytes / MB:9.1f} MB in RAM (texts and lookups) + "
+                  f"{store.footprint()['mapped_mb']:.1f} MB mapped, {query_ms:.3f} ms/query, "
+                  f"recall@{args.k} {recall:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Add src to python path to allow imports
+src_path = Path(__file__).parent
+sys.path.append(str(src_path))
+
+from data_classes.compact import CompactDocument
+from data_classes.documents import Document
+
+
+def find_dataset_path() -> Path:
+    dataset_path = Path("HotpotQA_Dev")
+    if not dataset_path.exists():
+        # Fallback for running from src or other locations if PWD is not project root
+        project_root = Path(__file__).parent.parent
+        dataset_path = project_root / "HotpotQA_Dev"
+        if not dataset_path.exists():
+            dataset_path = project_root / "data" / "HotpotQA_Dev"
+    return dataset_path
+
+
+def measure(label: str, folders, build):
+    """Load every folder with `build` and report traced bytes per document, with and without the text itself."""
+    gc.collect()
+    tracemalloc.start()
+    objects = [build(folder) for folder in folders]
+    gc.collect()
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = len(objects)
+    text_bytes = sum(sys.getsizeof(o.text) for o in objects)
+    per_doc = traced / count
+    overhead = (traced - text_bytes) / count
+    print(f"{label:>10}: {traced / 1e6:8.2f} MB total, {per_doc:8.0f} B/doc, "
+          f"{overhead:8.0f} B/doc excluding text, peak {peak / 1e6:.2f} MB")
+    return {"total_bytes": traced, "bytes_per_document": per_doc, "overhead_bytes_per_document": overhead}
+
+
+def main():
+    dataset_path = find_dataset_path()
+    if not dataset_path.exists():
+        print(f"Error: Dataset not found at {dataset_path.absolute()}")
+        return
+
+    folders = [sub for sub in sorted(dataset_path.iterdir()) if sub.is_dir()]
+    print(f"Measuring {len(folders)} documents from {dataset_path.absolute()}")
+
+    # Both variants load through Document.from_folder; the compact one converts and drops each
+    # Document immediately, so only the compact objects are alive when memory is measured.
+    before = measure("Document", folders, Document.from_folder)
+    after = measure("Compact", folders, lambda folder: CompactDocument.from_document(Document.from_folder(folder)))
+
+    saved = before["bytes_per_document"] - after["bytes_per_document"]
+    print(f"Saved {saved:.0f} B/doc ({saved / before['bytes_per_document']:.1%}); "
+          f"overhead excluding text {before['overhead_bytes_per_document']:.0f} -> "
+          f"{after['overhead_bytes_per_document']:.0f} B/doc")
+
+
+if __name__ == "__main__":
+    main()
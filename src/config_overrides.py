@@ -0,0 +1,23 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def parse_setting(assignment: str) -> Tuple[str, Any]:
+    """`NAME=VALUE` with VALUE parsed as JSON (`10`, `true`, `[10, 20]`, `null`) or else taken as a string."""
+    name, sep, raw = assignment.partition("=")
+    if not sep or not name.strip():
+        raise ValueError(f"Expected NAME=VALUE, got '{assignment}'")
+    try:
+        return name.strip(), json.loads(raw)
+    except json.JSONDecodeError:
+        return name.strip(), raw
+
+
+def load_overrides(config_path: Optional[str] = None, assignments: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Settings from a JSON object file, then `NAME=VALUE` assignments on top."""
+    overrides: Dict[str, Any] = {}
+    if config_path:
+        with open(config_path, "r", encoding="utf-8") as f:
+            overrides.update(json.load(f))
+    overrides.update(parse_setting(a) for a in assignments or [])
+    return overrides
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from datetime import date
+from types import MappingProxyType
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .documents import Document
+from .qa import Choice, Proof, QuestionAnswerPair
+from .rag_system import Chunk
+
+# Shared, read-only empty containers: objects without centroids or metadata all point at these
+EMPTY_CENTROIDS = np.empty((0, 0), dtype=np.float32)
+EMPTY_CENTROIDS.flags.writeable = False
+EMPTY_METADATA: Mapping[str, str] = MappingProxyType({})
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Authors, titles, labels and document ids repeat across many objects; interning keeps one copy each
+    return sys.intern(value) if value else value
+
+
+def pack_centroids(centroids: Optional[Sequence[Sequence[float]]]) -> np.ndarray:
+    """Nested float lists -> one contiguous float32 (n, dim) array; empty input shares EMPTY_CENTROIDS."""
+    if centroids is None or len(centroids) == 0:
+        return EMPTY_CENTROIDS
+    return np.ascontiguousarray(centroids, dtype=np.float32).reshape(len(centroids), -1)
+
+
+@dataclass(slots=True)
+class CompactChoice:
+    label: str
+    text: str
+
+    @classmethod
+    def from_choice(cls, choice: Choice) -> CompactChoice:
+        return cls(label=_intern(choice.label), text=choice.text)
+
+
+@dataclass(slots=True, frozen=True)
+class CompactProof:
+    document_id: str
+    context: str
+
+    @classmethod
+    def from_proof(cls, proof: Proof) -> CompactProof:
+        return cls(document_id=_intern(proof.document_id), context=proof.context)
+
+
+@dataclass(slots=True)
+class CompactQuestionAnswerPair:
+    question_id: str
+    question: str
+    choices: Tuple[CompactChoice, ...]
+    correct_answer: str
+    proofs: Tuple[CompactProof, ...]
+
+    @classmethod
+    def from_pair(cls, qa: QuestionAnswerPair) -> CompactQuestionAnswerPair:
+        return cls(
+            question_id=qa.question_id,
+            question=qa.question,
+            choices=tuple(CompactChoice.from_choice(c) for c in qa.choices),
+            correct_answer=_intern(qa.correct_answer),
+            proofs=tuple(CompactProof.from_proof(p) for p in qa.proofs),
+        )
+
+    def to_pair(self) -> QuestionAnswerPair:
+        return QuestionAnswerPair(
+            question_id=self.question_id,
+            question=self.question,
+            choices=[Choice(label=c.label, text=c.text) for c in self.choices],
+            correct_answer=self.correct_answer,
+            proofs=[Proof(document_id=p.document_id, context=p.context) for p in self.proofs],
+        )
+
+    def get_correct_choice(self) -> CompactChoice:
+        return next(c for c in self.choices if c.label == self.correct_answer)
+
+
+@dataclass(slots=True)
+class CompactDocument:
+    """
+    Slotted counterpart of `Document`.
+
+    Sequences are tuples (the empty tuple is a singleton), centroids are one
+    float32 array shared as EMPTY_CENTROIDS when unset, and title/author/reference
+    strings are interned.
+    """
+    id: str
+    title: str
+    author: str
+    publication_date: Optional[date]
+    references: Tuple[str, ...]
+    text: Optional[str] = None
+    qa_pairs: Tuple[CompactQuestionAnswerPair, ...] = ()
+    centroids: np.ndarray = field(default_factory=lambda: EMPTY_CENTROIDS) # shared, not copied
+
+    @classmethod
+    def from_document(cls, document: Document) -> CompactDocument:
+        return cls(
+            id=document.id,
+            title=_intern(document.title),
+            author=_intern(document.author),
+            publication_date=document.publication_date,
+            references=tuple(_intern(r) for r in document.references or ()),
+            text=document.text,
+            qa_pairs=tuple(CompactQuestionAnswerPair.from_pair(q) for q in document.qa_pairs or ()),
+            centroids=pack_centroids(document.centroids),
+        )
+
+    def to_document(self) -> Document:
+        return Document(
+            id=self.id,
+            title=self.title,
+            author=self.author,
+            publication_date=self.publication_date,
+            references=list(self.references),
+            text=self.text,
+            qa_pairs=[q.to_pair() for q in self.qa_pairs],
+            centroids=self.centroids.tolist(),
+        )
+
+    def set_centroids(self, centroids: Sequence[Sequence[float]]) -> None:
+        self.centroids = pack_centroids(centroids)
+
+
+@dataclass(slots=True)
+class CompactChunk:
+    chunk_id: str
+    text: str
+    score: Optional[float] = None
+    doc_id: Optional[str] = None
+    metadata: Mapping[str, str] = field(default_factory=lambda: EMPTY_METADATA)
+    chunk_scores: Optional[object] = None
+
+    @classmethod
+    def from_chunk(cls, chunk: Chunk) -> CompactChunk:
+        return cls(
+            chunk_id=chunk.chunk_id,
+            text=chunk.text,
+            score=chunk.score,
+            doc_id=_intern(chunk.doc_id),
+            metadata=MappingProxyType(dict(chunk.metadata)) if chunk.metadata else EMPTY_METADATA,
+            chunk_scores=chunk.chunk_scores,
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "chunk_id": self.chunk_id,
+            "text": self.text
+        }
+
+
+def compact_documents(documents: Iterable[Document]) -> List[CompactDocument]:
+    return [CompactDocument.from_document(d) for d in documents]
+
+
+def compact_qa_pairs(qa_pairs: Iterable[QuestionAnswerPair]) -> List[CompactQuestionAnswerPair]:
+    return [CompactQuestionAnswerPair.from_pair(q) for q in qa_pairs]
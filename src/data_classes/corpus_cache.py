@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .documents import Document, LazyDocument, load_metadata, load_qa_pairs, load_text_and_references
+from .qa import QuestionAnswerPair
+
+MAGIC = b"HRCORPUS"
+VERSION = 1
+ALIGNMENT = 8
+
+# Every column is a UTF-8 blob plus a uint64 offsets array with one more entry than values
+DOCUMENT_COLUMNS = ("id", "title", "author", "pub_date", "text", "qa")
+
+
+def default_cache_path(data_set_path: str | Path) -> Path:
+    """`<folder>.corpus` next to the dataset folder, so writing it does not change the folder's fingerprint."""
+    data_set_path = Path(data_set_path)
+    return data_set_path.with_name(data_set_path.name + ".corpus")
+
+
+def folder_fingerprint(data_set_path: str | Path) -> str:
+    """Hash of every file's relative path, size and mtime below `data_set_path`."""
+    root = Path(data_set_path)
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            stat = os.stat(os.path.join(dirpath, name))
+            rel = os.path.relpath(os.path.join(dirpath, name), root)
+            digest.update(f"{rel}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def quick_fingerprint(data_set_path: str | Path) -> str:
+    """
+    Hash of the folder's own mtime and the size and mtime of its top-level files (QA.json).
+
+    One directory read instead of a stat per document file: it changes when
+    document folders are added, removed or renamed, but not when a file inside
+    one is edited in place (`folder_fingerprint` catches that).
+    """
+    root = Path(data_set_path)
+    digest = hashlib.sha256(f"{os.stat(root).st_mtime_ns}\n".encode("utf-8"))
+    for entry in sorted(os.scandir(root), key=lambda e: e.name):
+        if entry.is_file():
+            stat = entry.stat()
+            digest.update(f"{entry.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _ColumnWriter:
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.offsets: List[int] = [0]
+
+    def append(self, value: Optional[str]) -> None:
+        encoded = (value or "").encode("utf-8")
+        self.parts.append(encoded)
+        self.offsets.append(self.offsets[-1] + len(encoded))
+
+
+def build_corpus_cache(data_set_path: str | Path, cache_path: Optional[str | Path] = None) -> Path:
+    """
+    Compile a dataset folder into a single binary corpus file.
+
+    Layout: MAGIC, a uint64 header length, a JSON header, then 8-byte aligned
+    sections. Each column (id, title, author, pub_date, processed text, per-document
+    QA JSON, flattened references, every QA pair of the dataset as JSON) is a
+    contiguous UTF-8 blob with a uint64 offsets array; `doc_references` maps
+    documents to their slice of the references column. The file is written to a
+    temporary name and renamed, so readers never see a half-written cache.
+    """
+    data_set_path = Path(data_set_path)
+    cache_path = Path(cache_path) if cache_path is not None else default_cache_path(data_set_path)
+    fingerprint = folder_fingerprint(data_set_path)
+    quick = quick_fingerprint(data_set_path)
+
+    columns: Dict[str, _ColumnWriter] = {name: _ColumnWriter() for name in DOCUMENT_COLUMNS}
+    columns["references"] = _ColumnWriter()
+    columns["qa_pairs"] = _ColumnWriter()
+    doc_references = [0]
+
+    qa_path = data_set_path / "QA.json"
+    if qa_path.exists():
+        try:
+            with qa_path.open(encoding="utf-8") as f:
+                for qa in json.load(f) or []:
+                    columns["qa_pairs"].append(json.dumps(qa))
+        except json.JSONDecodeError:
+            pass
+
+    for folder in sorted(data_set_path.iterdir()):
+        if not folder.is_dir():
+            continue
+        meta = load_metadata(folder)
+        text, references = load_text_and_references(folder)
+        qa_list = [_qa_to_dict(qa) for qa in load_qa_pairs(folder)]
+
+        columns["id"].append(folder.name)
+        columns["title"].append(meta.get("title"))
+        columns["author"].append(meta.get("author"))
+        columns["pub_date"].append(meta.get("pub_date"))
+        columns["text"].append(text)
+        columns["qa"].append(json.dumps(qa_list))
+        for reference in references:
+            columns["references"].append(reference)
+        doc_references.append(len(columns["references"].parts))
+        for qa in qa_list:
+            columns["qa_pairs"].append(json.dumps(qa))
+
+    # Section positions are relative to the end of the header, so the header can describe them before its size is known
+    sections: Dict[str, List[int]] = {}
+    payload: List[bytes] = []
+    position = 0
+
+    def add_section(name: str, data: bytes) -> None:
+        nonlocal position
+        padding = -position % ALIGNMENT
+        payload.append(b"\0" * padding)
+        position += padding
+        sections[name] = [position, len(data)]
+        payload.append(data)
+        position += len(data)
+
+    for name, column in columns.items():
+        add_section(f"{name}.offsets", np.asarray(column.offsets, dtype=np.uint64).tobytes())
+        add_section(f"{name}.blob", b"".join(column.parts))
+    add_section("doc_references", np.asarray(doc_references, dtype=np.uint64).tobytes())
+
+    header = json.dumps({
+        "version": VERSION,
+        "source": str(data_set_path.resolve()),
+        "fingerprint": fingerprint,
+        "quick_fingerprint": quick,
+        "document_count": len(doc_references) - 1,
+        "sections": sections,
+    }).encode("utf-8")
+    data_start = len(MAGIC) + 8 + len(header)
+    header += b" " * (-data_start % ALIGNMENT)
+
+    # Per-process name: several experiment processes (run_matrix.py cells) may rebuild the same cache at once
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for part in payload:
+            f.write(part)
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def _qa_to_dict(qa: QuestionAnswerPair) -> dict:
+    return {
+        "question_id": qa.question_id,
+        "question": qa.question,
+        "choices": [{"label": c.label, "text": c.text} for c in qa.choices],
+        "correct_answer": qa.correct_answer,
+        "proofs": [{"document_id": p.document_id, "context": p.context} for p in qa.proofs],
+    }
+
+
+class _Column:
+    """Read-only view of one string column; values are decoded from the mapping on access."""
+
+    def __init__(self, buffer: memoryview, offsets: np.ndarray, blob: Tuple[int, int]):
+        self.offsets = offsets
+        self.blob = buffer[blob[0]:blob[0] + blob[1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return str(self.blob[int(self.offsets[index]):int(self.offsets[index + 1])], "utf-8")
+
+
+class LazySequence(Sequence):
+    """Sequence that builds its items on access; slicing returns another lazy sequence."""
+
+    def __init__(self, length: int, factory: Callable[[int], object], indices: Optional[range] = None):
+        self._factory = factory
+        self._indices = indices if indices is not None else range(length)
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazySequence(0, self._factory, self._indices[index])
+        return self._factory(self._indices[index])
+
+
+class CachedDocument(LazyDocument):
+    """A document backed by a `CorpusCache`; text, references and QA pairs are decoded on first access."""
+
+    def __init__(self, cache: CorpusCache, index: int):
+        meta = {
+            "title": cache.column("title")[index] or None,
+            "author": cache.column("author")[index] or None,
+            "pub_date": cache.column("pub_date")[index] or None,
+        }
+        super().__init__(Path(cache.source) / cache.column("id")[index], meta)
+        self.cache = cache
+        self.index = index
+
+    def _load_text_and_references(self) -> Tuple[str, List[str]]:
+        return self.cache.column("text")[self.index], self.cache.references(self.index)
+
+    def _load_qa_pairs(self) -> List[QuestionAnswerPair]:
+        return [QuestionAnswerPair.from_dict(q) for q in json.loads(self.cache.column("qa")[self.index])]
+
+
+class CorpusCache:
+    """
+    Memory-mapped view of a file written by `build_corpus_cache`.
+
+    Opening only parses the small JSON header and wraps the offset arrays with
+    numpy (no copies), so startup cost does not grow with the corpus size.
+    """
+
+    def __init__(self, cache_path: str | Path):
+        self.path = Path(cache_path)
+        self._buffer: Optional[memoryview] = None
+        self._columns: Dict[str, _Column] = {}
+        self._doc_references: Optional[np.ndarray] = None
+        self._file = open(self.path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        try:
+            self._parse_header()
+        except BaseException:
+            self.close()
+            raise
+
+    def _parse_header(self) -> None:
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a corpus cache")
+        (header_len,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[header_start:header_start + header_len])
+        if self.header["version"] != VERSION:
+            raise ValueError(f"{self.path} has cache version {self.header['version']}, expected {VERSION}")
+        self.source = self.header["source"]
+        self.fingerprint = self.header["fingerprint"]
+        self.quick_fingerprint = self.header.get("quick_fingerprint")
+        self.document_count = self.header["document_count"]
+
+        self._buffer = memoryview(self._mmap)[header_start + header_len:]
+        start, length = self.header["sections"]["doc_references"]
+        self._doc_references = np.frombuffer(self._buffer[start:start + length], dtype=np.uint64)
+
+    def column(self, name: str) -> _Column:
+        column = self._columns.get(name)
+        if column is None:
+            sections = self.header["sections"]
+            start, length = sections[f"{name}.offsets"]
+            offsets = np.frombuffer(self._buffer[start:start + length], dtype=np.uint64)
+            column = self._columns[name] = _Column(self._buffer, offsets, sections[f"{name}.blob"])
+        return column
+
+    def references(self, index: int) -> List[str]:
+        references = self.column("references")
+        return [references[i] for i in range(int(self._doc_references[index]), int(self._doc_references[index + 1]))]
+
+    def document(self, index: int) -> Document:
+        return CachedDocument(self, index)
+
+    def documents(self) -> LazySequence:
+        return LazySequence(self.document_count, self.document)
+
+    def qa_pairs(self) -> LazySequence:
+        column = self.column("qa_pairs")
+        return LazySequence(len(column), lambda i: QuestionAnswerPair.from_dict(json.loads(column[i])))
+
+    def is_current(self, data_set_path: str | Path, thorough: bool = False) -> bool:
+        if thorough:
+            return self.fingerprint == folder_fingerprint(data_set_path)
+        return self.quick_fingerprint == quick_fingerprint(data_set_path)
+
+    def close(self) -> None:
+        """Unmap and close the file; documents and columns taken from this cache must not be used afterwards."""
+        # The numpy views export the buffer, and the map cannot be closed while exports exist
+        self._columns = {}
+        self._doc_references = None
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+        self._mmap.close()
+        self._file.close()
+
+
+def open_corpus_cache(data_set_path: str | Path, cache_path: Optional[str | Path] = None,
+                      validate: bool = True, thorough: bool = False) -> CorpusCache:
+    """
+    Open the cache for `data_set_path`, (re)building it if it is missing or stale.
+
+    Validation only reads the folder itself (see `quick_fingerprint`), so reopening
+    does not grow with the corpus. `thorough=True` stats every file instead, to
+    catch documents edited in place; `validate=False` trusts an existing cache.
+    """
+    cache_path = Path(cache_path) if cache_path is not None else default_cache_path(data_set_path)
+    if cache_path.exists():
+        try:
+            cache = CorpusCache(cache_path)
+        except (ValueError, KeyError, struct.error):
+            cache = None # Unreadable or from another version: rebuild
+        if cache is not None and (not validate or cache.is_current(data_set_path, thorough)):
+            return cache
+        if cache is not None:
+            print(f"Corpus cache {cache_path} is stale, rebuilding...")
+            cache.close() # Before the rebuild replaces the file under the map
+    build_corpus_cache(data_set_path, cache_path)
+    return CorpusCache(cache_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a dataset folder into a single memory-mappable corpus file.")
+    parser.add_argument("data_set_path", help="Dataset folder with one sub-folder per document")
+    parser.add_argument("--output", default=None, help="Cache file (default: <data_set_path>.corpus)")
+    args = parser.parse_args()
+
+    cache_path = build_corpus_cache(args.data_set_path, args.output)
+    cache = CorpusCache(cache_path)
+    print(f"Wrote {cache.document_count} documents and {len(cache.qa_pairs())} QA pairs to {cache_path} "
+          f"({os.path.getsize(cache_path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,69 @@
 import json
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Sequence
 
 from . import documents
 from .documents import Document
 from .qa import QuestionAnswerPair
 
 
+def _document_qa_pairs(document: Document) -> List[QuestionAnswerPair]:
+    return document.qa_pairs
+
+
 @dataclass
 class DataSet:
-    documents: List[Document]
-    qa_pairs: List[QuestionAnswerPair] = None
+    documents: Sequence[Document]
+    qa_pairs: Sequence[QuestionAnswerPair] = None
 
-    def __init__(self, data_set_path: Path):
+    def __init__(self, data_set_path: Path, workers: int = 1, lazy: bool = False, use_processes: bool = False):
+        """
+        `workers` > 1 loads document folders concurrently (threads by default; set
+        `use_processes` when eager loading is bound by the reference regex rather
+        than I/O). With `lazy=True` only metadata is read up front and each
+        document's text/references are read on first access.
+        """
+        self.workers = workers
+        self.lazy = lazy
+        self.use_processes = use_processes
         self.documents = self.load_documents(data_set_path)
         self.qa_pairs = self.load_qa(data_set_path)
 
+    @classmethod
+    def from_cache(cls, data_set_path: Path, cache_path: Optional[Path] = None, validate: bool = True,
+                   thorough: bool = False) -> "DataSet":
+        """
+        Open the dataset from its compiled corpus cache (see `corpus_cache.py`),
+        building it first if it is missing or older than the folder. Documents and
+        QA pairs are sequences that decode entries from the memory map on access.
+        """
+        from .corpus_cache import open_corpus_cache
+
+        cache = open_corpus_cache(data_set_path, cache_path, validate=validate, thorough=thorough)
+        data_set = cls.__new__(cls)
+        data_set.workers = 1
+        data_set.lazy = True
+        data_set.use_processes = False
+        data_set.cache = cache
+        data_set.documents = cache.documents()
+        data_set.qa_pairs = cache.qa_pairs()
+        return data_set
+
     def load_documents(self, root: str | Path) -> List[Document]:
         root = Path(root)
-        docs: List[Document] = []
-        for sub in sorted(root.iterdir()):
-            if sub.is_dir():
-                docs.append(Document.from_folder(sub))
-        return docs
+        folders = [sub for sub in sorted(root.iterdir()) if sub.is_dir()]
+        load = partial(Document.from_folder, lazy=self.lazy)
+        if self.workers <= 1:
+            return [load(folder) for folder in folders]
+        with self._executor() as executor:
+            # map keeps folder order, so document order matches the sequential loader
+            return list(executor.map(load, folders, chunksize=self._chunksize(len(folders))))
 
     def load_qa(self, qa_path: str | Path) -> List[QuestionAnswerPair]:
-        qa_path = qa_path / "QA.json"
+        qa_path = Path(qa_path) / "QA.json"
         qa_pairs: List[QuestionAnswerPair] = []
         if qa_path.exists():
             try:
@@ -35,7 +72,21 @@ class DataSet:
                 qa_pairs = [QuestionAnswerPair.from_dict(q) for q in qa_list]
             except json.JSONDecodeError:
                 qa_pairs = []
+        if self.lazy and self.workers > 1:
+            # Lazy documents read their QA files here; threads suffice since the results stay in this process
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for document_qa in executor.map(_document_qa_pairs, self.documents):
+                    qa_pairs.extend(document_qa)
+            return qa_pairs
         for document in self.documents:
             qa_pairs.extend(document.qa_pairs)
         return qa_pairs
 
+    def _executor(self) -> Executor:
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def _chunksize(self, count: int) -> int:
+        # Only used by process pools; amortizes pickling over several folders per task
+        return max(1, count // (self.workers * 4)) if self.use_processes else 1
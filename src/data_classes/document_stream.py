@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Iterator, List
+
+from .documents import Document, load_qa_pairs
+from .qa import QuestionAnswerPair
+
+
+class DocumentStream:
+    """
+    Iterates a corpus one document at a time without materializing it.
+
+    `source` is either a dataset folder (one sub-folder per document, as read by
+    `DataSet`) or a JSONL file with one `Document.from_dict` record per line,
+    as written by `unpack_dataset.py --stream` next to the dataset's QA.json.
+    Documents are assigned round-robin to `num_shards` shards by their position
+    in the corpus, and only those of `shard_index` are yielded.
+
+    `offset` counts the documents of this shard consumed so far; passing it back
+    as `start_offset` resumes right after them. Skipped documents are never
+    parsed (folders are not opened, JSONL lines are not decoded).
+    """
+
+    def __init__(self, source: str | Path, shard_index: int = 0, num_shards: int = 1,
+                 start_offset: int = 0, lazy: bool = False):
+        if num_shards < 1 or not 0 <= shard_index < num_shards:
+            raise ValueError(f"Invalid shard {shard_index} of {num_shards}")
+        self.source = Path(source)
+        self.shard_index = shard_index
+        self.num_shards = num_shards
+        self.start_offset = start_offset
+        self.offset = start_offset
+        self.lazy = lazy
+        self.is_jsonl = self.source.is_file()
+
+    def with_offset(self, start_offset: int) -> DocumentStream:
+        """A fresh stream over the same shard, starting after `start_offset` documents."""
+        return DocumentStream(self.source, self.shard_index, self.num_shards, start_offset, self.lazy)
+
+    def __iter__(self) -> Iterator[Document]:
+        self.offset = self.start_offset
+        records = self._iter_jsonl_lines() if self.is_jsonl else self._iter_folders()
+        for position, record in enumerate(records):
+            if position < self.start_offset:
+                continue
+            document = Document.from_dict(json.loads(record)) if self.is_jsonl \
+                else Document.from_folder(record, lazy=self.lazy)
+            self.offset += 1
+            yield document
+
+    def batches(self, batch_size: int) -> Iterator[List[Document]]:
+        """Fixed-size lists of documents; the last one may be shorter."""
+        batch: List[Document] = []
+        for document in self:
+            batch.append(document)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_qa_pairs(self) -> Iterator[QuestionAnswerPair]:
+        """
+        QA pairs of this shard's documents, in document order. Dataset-level pairs
+        (the QA.json in a dataset folder, or next to a JSONL corpus) belong to
+        shard 0. `start_offset` is not applied.
+        """
+        qa_path = self.source.with_name("QA.json") if self.is_jsonl else self.source / "QA.json"
+        if self.shard_index == 0 and qa_path.exists():
+            try:
+                with qa_path.open(encoding="utf-8") as f:
+                    qa_list = json.load(f) or []
+            except json.JSONDecodeError:
+                qa_list = []
+            for qa in qa_list:
+                yield QuestionAnswerPair.from_dict(qa)
+
+        if self.is_jsonl:
+            for line in self._iter_jsonl_lines():
+                for qa in json.loads(line).get("qa_pairs") or []:
+                    yield QuestionAnswerPair.from_dict(qa)
+            return
+        for folder in self._iter_folders():
+            yield from load_qa_pairs(folder)
+
+    def _iter_folders(self) -> Iterator[Path]:
+        # Only the folder names are held in memory, sorted like DataSet.load_documents
+        names = sorted(entry.name for entry in os.scandir(self.source) if entry.is_dir())
+        for index in range(self.shard_index, len(names), self.num_shards):
+            yield self.source / names[index]
+
+    def _iter_jsonl_lines(self) -> Iterator[str]:
+        with self.source.open(encoding="utf-8") as f:
+            index = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                if index % self.num_shards == self.shard_index:
+                    yield line
+                index += 1
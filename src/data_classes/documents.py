@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import re
+import threading
 from dataclasses import dataclass, field
 from datetime import date
 from pathlib import Path
@@ -21,51 +22,181 @@ class Document:
     centroids: List[List[float]] = field(default_factory=list)
 
     @classmethod
-    def from_folder(cls, folder: str | Path) -> Document:
+    def from_folder(cls, folder: str | Path, lazy: bool = False) -> Document:
+        """
+        Load a document folder. With `lazy=True` only the metadata is read now and
+        a `LazyDocument` reads text/references/QA pairs on first access.
+        """
         folder = Path(folder)
         doc_id = folder.name
 
         # --- Load metadata ---
-        meta_path = folder / f"{doc_id}_metadata.json"
-        with meta_path.open(encoding="utf-8") as f:
-            meta = json.load(f)
+        meta = load_metadata(folder)
+        if lazy:
+            return LazyDocument(folder, meta)
 
         # --- Raw text + references ---
-        raw_path = folder / f"{doc_id}_raw.txt"
-        raw_text = raw_path.read_text(encoding="utf-8")
-        text, references = process_raw_and_extract_references(raw_text)
+        text, references = load_text_and_references(folder)
 
         # --- QA pairs ---
-        qa_path = folder / f"{doc_id}_qa.json"
-        qa_pairs: List[QuestionAnswerPair] = []
-        if qa_path.exists():
-            try:
-                with qa_path.open(encoding="utf-8") as f:
-                    qa_list = json.load(f) or []
-                qa_pairs = [QuestionAnswerPair.from_dict(q) for q in qa_list]
-            except json.JSONDecodeError:
-                qa_pairs = []
-
-        # --- Publication date (nullable) ---
-        pub_date_raw = meta.get("pub_date")
-        pub_date: Optional[date] = None
-        if pub_date_raw:
-            try:
-                pub_date = date.fromisoformat(pub_date_raw)
-            except ValueError:
-                # not in ISO format, ignore and leave as None
-                pub_date = None
+        qa_pairs = load_qa_pairs(folder)
 
         return cls(
             id=doc_id,
             title=meta.get("title"),
             author=meta.get("author"),
-            publication_date=pub_date,
+            publication_date=parse_publication_date(meta),
             text=text,
             references=references,
             qa_pairs=qa_pairs,
         )
 
+    @classmethod
+    def from_dict(cls, data: dict) -> Document:
+        """
+        Build a document from one JSONL corpus record. `text` may still contain
+        `ref{...}` markers when no `references` list is given; they are stripped here.
+        """
+        text = data.get("text") or ""
+        references = data.get("references")
+        if references is None:
+            text, references = process_raw_and_extract_references(text)
+        return cls(
+            id=data["id"],
+            title=data.get("title"),
+            author=data.get("author"),
+            publication_date=parse_publication_date(data),
+            text=text,
+            references=references,
+            qa_pairs=[QuestionAnswerPair.from_dict(q) for q in data.get("qa_pairs") or []],
+        )
+
+
+class LazyDocument(Document):
+    """
+    A `Document` whose text, references and QA pairs stay on disk until first access.
+
+    Loading is thread-safe and happens at most once per field group (the raw text
+    file yields both `text` and `references`). `release()` drops the loaded
+    content again so long runs do not keep every indexed document resident.
+    """
+
+    def __init__(self, folder: Path, meta: dict):
+        self.folder = folder
+        self.id = folder.name
+        self.title = meta.get("title")
+        self.author = meta.get("author")
+        self.publication_date = parse_publication_date(meta)
+        self.centroids = []
+        self._lock = threading.Lock()
+        self._text: Optional[str] = None
+        self._references: Optional[List[str]] = None
+        self._qa_pairs: Optional[List[QuestionAnswerPair]] = None
+
+    @property
+    def text(self) -> str:
+        return self._ensure_text()[0]
+
+    @text.setter
+    def text(self, value: str) -> None:
+        self._text = value
+
+    @property
+    def references(self) -> List[str]:
+        return self._ensure_text()[1]
+
+    @references.setter
+    def references(self, value: List[str]) -> None:
+        self._references = value
+
+    @property
+    def qa_pairs(self) -> List[QuestionAnswerPair]:
+        if self._qa_pairs is None:
+            with self._lock:
+                if self._qa_pairs is None:
+                    self._qa_pairs = self._load_qa_pairs()
+        return self._qa_pairs
+
+    @qa_pairs.setter
+    def qa_pairs(self, value: List[QuestionAnswerPair]) -> None:
+        self._qa_pairs = value
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._text is not None
+
+    def release(self) -> None:
+        """Forget the loaded text and references; they are re-read on next access."""
+        with self._lock:
+            self._text = None
+            self._references = None
+
+    def _ensure_text(self) -> Tuple[str, List[str]]:
+        # Returns the values it saw rather than re-reading the fields, which a concurrent release() may clear
+        text, references = self._text, self._references
+        if text is None or references is None:
+            with self._lock:
+                text, references = self._text, self._references
+                if text is None or references is None:
+                    text, references = self._load_text_and_references()
+                    self._references = references
+                    self._text = text
+        return text, references
+
+    def _load_text_and_references(self) -> Tuple[str, List[str]]:
+        return load_text_and_references(self.folder)
+
+    def _load_qa_pairs(self) -> List[QuestionAnswerPair]:
+        return load_qa_pairs(self.folder)
+
+    def __getstate__(self) -> dict:
+        # Locks cannot be pickled (process-pool loading)
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def load_metadata(folder: Path) -> dict:
+    meta_path = folder / f"{folder.name}_metadata.json"
+    with meta_path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_publication_date(meta: dict) -> Optional[date]:
+    # --- Publication date (nullable) ---
+    pub_date_raw = meta.get("pub_date")
+    if pub_date_raw:
+        try:
+            return date.fromisoformat(pub_date_raw)
+        except ValueError:
+            # not in ISO format, ignore and leave as None
+            return None
+    return None
+
+
+def load_text_and_references(folder: Path) -> Tuple[str, List[str]]:
+    raw_path = folder / f"{folder.name}_raw.txt"
+    raw_text = raw_path.read_text(encoding="utf-8")
+    return process_raw_and_extract_references(raw_text)
+
+
+def load_qa_pairs(folder: Path) -> List[QuestionAnswerPair]:
+    qa_path = folder / f"{folder.name}_qa.json"
+    qa_pairs: List[QuestionAnswerPair] = []
+    if qa_path.exists():
+        try:
+            with qa_path.open(encoding="utf-8") as f:
+                qa_list = json.load(f) or []
+            qa_pairs = [QuestionAnswerPair.from_dict(q) for q in qa_list]
+        except json.JSONDecodeError:
+            qa_pairs = []
+    return qa_pairs
+
+
 def process_raw_and_extract_references(raw_text) -> Tuple[str, List[str]]:
     """
     Remove all occurrences of `ref{...}` from raw_text and collect the contents.
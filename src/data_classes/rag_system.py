@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import threading
+import unicodedata
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Protocol, runtime_checkable
+from typing import Any, Dict, List, Optional, Protocol, Tuple, runtime_checkable
 
 from .documents import Document
 from .qa import QuestionAnswerPair
@@ -36,12 +39,155 @@ class Retriever(Protocol):
         ...
 
 
+@runtime_checkable
+class EmbeddingRetriever(Retriever, Protocol):
+    """A `Retriever` that can also embed a question on its own and retrieve for a given query embedding."""
+    embedding_model_name: str
+
+    @abstractmethod
+    def embed_question(self, question: str) -> Any:
+        ...
+
+    @abstractmethod
+    def retrieve_by_embedding(self, question: str, embedding: Any, k: int = 5,
+                              qa_pair: Optional[QuestionAnswerPair] = None) -> List[Chunk]:
+        ...
+
+
 @runtime_checkable
 class Generator(Protocol):
     @abstractmethod
     def generate(self, qa_pair: QuestionAnswerPair, context: List[Chunk]) -> str:
         ...
 
+def normalize_question(question: str) -> str:
+    """Cache key form of a question: NFC, case-folded, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", question).casefold().split())
+
+
+class IndexGeneration:
+    """Counter bumped on every index change; cached retrieval results are only valid for the value they were computed at."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class CachingRetriever:
+    """
+    LRU cache in front of a `Retriever`.
+
+    Top-k results are keyed by (normalized question, k) and tagged with the
+    `IndexGeneration` they were computed at; an entry from an older generation
+    counts as a miss ("stale") and is recomputed, so results from before an
+    index change are never served. `qa_pair` is passed through on misses but is
+    not part of the key.
+
+    When the wrapped retriever is an `EmbeddingRetriever`, misses retrieve from
+    a query embedding held in a second LRU keyed by normalized question. Query
+    embeddings do not depend on the index, so those entries survive index
+    changes and are only recomputed when `embedding_model_name` changes.
+    """
+
+    def __init__(self, retriever: Retriever, generation: IndexGeneration, max_entries: int = 10_000,
+                 max_embeddings: int = 10_000):
+        self.retriever = retriever
+        self.generation = generation
+        self.max_entries = max_entries
+        self.max_embeddings = max_embeddings
+        self._by_embedding = isinstance(retriever, EmbeddingRetriever)
+        self._results: OrderedDict[Tuple[str, int], Tuple[int, List[Chunk]]] = OrderedDict()
+        self._embeddings: OrderedDict[str, Tuple[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+
+    def retrieve(self, question: str, k: int = 5, qa_pair: Optional[QuestionAnswerPair] = None) -> List[Chunk]:
+        key = (normalize_question(question), k)
+        generation = self.generation.value
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] == generation:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                self.stale += 1
+            self.misses += 1
+
+        # Computed outside the lock so slow retrievals do not serialize; the generation read above
+        # tags the result, so an index change that lands meanwhile makes it stale rather than wrong.
+        if self._by_embedding:
+            chunks = self.retriever.retrieve_by_embedding(question, self.embed(question), k, qa_pair)
+        else:
+            chunks = self.retriever.retrieve(question, k, qa_pair)
+        with self._lock:
+            self._results[key] = (generation, list(chunks))
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+                self.evictions += 1
+        return chunks
+
+    def embed(self, question: str) -> Any:
+        """Query embedding of `question` from the wrapped `EmbeddingRetriever`, cached until its model changes."""
+        if not self._by_embedding:
+            raise TypeError(f"{type(self.retriever).__name__} does not expose query embeddings")
+        key = normalize_question(question)
+        model = self.retriever.embedding_model_name
+        with self._lock:
+            entry = self._embeddings.get(key)
+            if entry is not None and entry[0] == model:
+                self._embeddings.move_to_end(key)
+                self.embedding_hits += 1
+                return entry[1]
+            self.embedding_misses += 1
+
+        embedding = self.retriever.embed_question(question)
+        with self._lock:
+            self._embeddings[key] = (model, embedding)
+            self._embeddings.move_to_end(key)
+            while len(self._embeddings) > self.max_embeddings:
+                self._embeddings.popitem(last=False)
+        return embedding
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._embeddings.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            embedding_lookups = self.embedding_hits + self.embedding_misses
+            return {
+                "entries": len(self._results),
+                "max_entries": self.max_entries,
+                "generation": self.generation.value,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "embedding_entries": len(self._embeddings),
+                "embedding_hit_rate": self.embedding_hits / embedding_lookups if embedding_lookups else 0.0,
+            }
+
+
 class RAGSystem(ABC):
     def __init__(
         self,
@@ -51,15 +197,28 @@ class RAGSystem(ABC):
         generator: Generator,
         name: str,
         log: RunLogger,
+        retrieval_cache_size: Optional[int] = None,
     ):
         self._name = name
         self._indexer = indexer
+        self._generation = IndexGeneration()
+        if retrieval_cache_size:
+            retriever = CachingRetriever(retriever, self._generation, max_entries=retrieval_cache_size)
         self._retriever = retriever
         self._generator = generator
         self.log = log
 
     def index_document(self, document: Document) -> None:
-        self._indexer.index(document)
+        try:
+            self._indexer.index(document)
+        finally:
+            # Bumped after indexing: a retrieval racing with this call is tagged with the old generation.
+            # Also on failure, since the indexer may have applied part of the document.
+            self._generation.bump()
+
+    @property
+    def generation(self) -> IndexGeneration:
+        return self._generation
 
     @property
     def name(self) -> str:
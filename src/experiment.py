@@ -3,9 +3,11 @@ import sys
 import time
 import json
 import shutil
+import argparse
+import itertools
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Ensure src is in path
 sys.path.append(os.path.join(os.path.dirname(__file__), "."))
@@ -13,9 +15,89 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "."))
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from data_classes.data_set import DataSet
+from data_classes.documents import LazyDocument
+from data_classes.document_stream import DocumentStream
 from hipporag import HippoRAG
 from hipporag.utils.config_utils import BaseConfig
 from models.embedding import OpenRouterEmbeddingModel
+from models.offline_backend import OfflineOpenAIServer
+from config_overrides import load_overrides
+from profiling import PhaseProfiler
+from memory_tracking import MemoryTracker
+from retrieval_benchmark import RetrievalLoadGenerator
+from batched_retrieval import measure_batch_sizes
+from models.dense_retriever import NumpyDenseRetriever
+from patches import incremental_graph, quantized_store, sparse_ppr, synonymy_ann
+
+# Configuration
+SUBSETS = [10, 20, 40, 80, 200, 400, 600, 800, 1000, 1200, 1400, 1600, 1800, 2000, 2200, 2400, 2600, 2800, 3000, 3200, 3400, 3600, 3800, 4000]
+RETRIEVAL_QUERY_COUNT = 10
+# Retrieval load test per step: rag.retrieve only (no answer generation), each run on its own fresh queries
+RETRIEVAL_BENCHMARK = False # ~80 extra retrieve calls (each with an LLM rerank) per step; meant for OFFLINE_BACKEND runs
+RETRIEVAL_BENCHMARK_QUERIES = 20 # Queries per run
+RETRIEVAL_WARMUP_QUERIES = 2
+RETRIEVAL_CONCURRENCY = [1, 4] # Closed-loop runs
+RETRIEVAL_ARRIVAL_RATES_QPS = [0.5, 2.0] # Open-loop (Poisson arrival) runs
+# Batched retrieval: amortized per-query cost when queries are embedded and scored together; [] disables
+RETRIEVAL_BATCH_SIZES = [1, 4, 16]
+RETRIEVAL_BATCH_QUERIES = 16 # Queries per batch size, a multiple of every size
+# Dense baseline: index and query the same documents with a flat NumPy index as a linear-cost reference curve.
+# It shares the embedding model (and cache), so its cost is the index structure rather than the embedding calls.
+DENSE_BASELINE = True
+DENSE_BASELINE_DTYPE = "float32" # or "float16"
+# Synonymy ANN: only new entities query an incremental IVF index for their synonymy neighbours instead of
+# HippoRAG's exact all-pairs KNN on every index call. The recall check compares against exact search each step.
+SYNONYMY_ANN = False
+SYNONYMY_ANN_NPROBE = 8
+SYNONYMY_ANN_RECALL_SAMPLE = 200 # 0 disables the recall check
+# Incremental graph: rag.index appends only the new nodes and edges and updates lookups in place; OpenIE results,
+# embedding stores and the graph are written once per step (inside the step time) instead of on every index call.
+# It always takes its synonymy edges from the synonymy ANN, which it installs with defaults when SYNONYMY_ANN is off.
+INCREMENTAL_GRAPH = False
+# Embedding stores: None keeps HippoRAG's parquet stores (all vectors in RAM); "float16" or "int8" keeps them
+# quantized in append-only memory-mapped files and scores retrieval against the map.
+EMBEDDING_STORE_DTYPE = None
+# PPR: "igraph" (HippoRAG's prpack call per query) or "sparse" (SciPy CSR power iteration, batched across the
+# queries of a batched retrieval and warm-started from the global PageRank). The benchmark compares both on
+# the current graph each step for latency and top-k agreement; 0 disables it. With the igraph engine the
+# benchmark keeps its own edge mirror and CSR copy of the graph, which shows up in the recorded memory.
+PPR_ENGINE = "igraph"
+PPR_BENCHMARK_QUERIES = 0
+# Models and embedding request sizing
+LLM_NAME = "meta-llama/llama-3.3-70b-instruct"
+EMBEDDING_MODEL_NAME = "openai/text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = 8 # Reduced from HippoRAG's default 16 for better OpenRouter stability
+EMBEDDING_CONCURRENCY = 4 # Batches kept in flight by OpenRouterEmbeddingModel.batch_encode
+EMBEDDING_TOKEN_BUDGET = 8000 # Pack short entity/fact strings by estimated tokens instead of a fixed count per call
+SAVE_DIR = "hipporag_test_run"
+RESULTS_FILE = "scaling_results.json"
+PROFILE_FILE = "phase_profile.jsonl" # One record per step with per-phase wall/CPU time, calls and bytes sent
+EMBEDDING_CACHE_DIR = "embedding_cache" # Lives outside SAVE_DIR so it survives the clean start
+DATASET_WORKERS = 8 # Threads reading document folders concurrently at startup
+LAZY_DOCUMENTS = True # Read document text on first use (and release it once indexed) instead of at startup
+USE_CORPUS_CACHE = True # Load from the compiled <data folder>.corpus file, rebuilt when the folder changes
+# Streaming: read documents from disk as each step needs them instead of loading the corpus up front
+STREAM_DOCUMENTS = False
+STREAM_SOURCE = None # Dataset folder or JSONL corpus; None streams the HotpotQA folder
+# Indexing strategy: "per_document" (one rag.index call per document), "micro_batch" (MICRO_BATCH_SIZE
+# documents per call) or "bulk" (all new documents of a step in one call). Listing several runs them
+# one after another, each in its own save dir, and prints their indexing times side by side.
+INDEXING_STRATEGIES = ["per_document"]
+MICRO_BATCH_SIZE = 10
+# Resume: keep the existing save dir and continue after the last completed subset recorded in its
+# checkpoint file (<save dir>.checkpoint.json). Steps run after a resume are tagged "resumed".
+RESUME = False
+# Offline backend: serve chat + embeddings locally so network latency does not drown out HippoRAG's own cost
+OFFLINE_BACKEND = False
+OFFLINE_MODE = "synthetic" # "synthetic", "record" (proxy OpenRouter and store) or "replay"
+OFFLINE_RECORD_PATH = "offline_recording.jsonl"
+OFFLINE_LATENCY_MS = 0.0
+OFFLINE_LATENCY_JITTER_MS = 0.0
+# Memory: stop cleanly (with a final results flush) before the OS OOM-kills the run
+MEMORY_CEILING_GB = 56 # None disables the guard
+TRACK_ALLOCATIONS = False # tracemalloc top allocators per step; slows Python-heavy phases, so only for memory investigations
+
+INDEXING_STRATEGY_NAMES = ("per_document", "micro_batch", "bulk")
 
 def setup_env():
     """Setup environment variables for OpenRouter/OpenAI compatibility."""
@@ -33,72 +115,49 @@ def setup_env():
                     api_key = content
         except Exception as e:
             print(f"Error reading key file: {e}")
-            
+
     if api_key:
         os.environ["OPENAI_API_KEY"] = api_key
     else:
         print("Warning: OPENROUTER_API_KEY not found.")
 
-def main():
-    print("--- Starting HippoRAG Scaling Experiment ---")
-    setup_env()
-    
-    # Configuration
-    SUBSETS = [10, 20, 40, 80, 200, 400, 600, 800, 1000, 1200, 1400, 1600, 1800, 2000, 2200, 2400, 2600, 2800, 3000, 3200, 3400, 3600, 3800, 4000]
-    RETRIEVAL_QUERY_COUNT = 10
-    SAVE_DIR = "hipporag_test_run"
-    RESULTS_FILE = "scaling_results.json"
-    
-    # 1. Load Data
+def find_data_path() -> Optional[Path]:
     project_root = Path(__file__).parent.parent
-    data_path = project_root / "data" / "HotpotQA_Dev"
-    
+
     # Fallback paths logic from test_HippoRAG2.py
     possible_paths = [
         Path("data/HotpotQA_Dev"),
         project_root / "HotpotQA_Dev",
         project_root / "data" / "HotpotQA_Dev"
     ]
-    
-    final_data_path = None
+
     for p in possible_paths:
         if p.exists():
-            final_data_path = p
-            break
-            
-    if not final_data_path:
-        print(f"Error: Data path not found. Checked: {[str(p) for p in possible_paths]}")
-        return
+            return p
 
-    print(f"Loading data from: {final_data_path}")
-    dataset = DataSet(final_data_path)
-    all_docs = dataset.documents
-    print(f"Total documents available: {len(all_docs)}")
-    
-    # Prepare queries
-    all_queries = []
-    if dataset.qa_pairs:
-        all_queries = [qa.question for qa in dataset.qa_pairs]
-    
-    retrieval_queries = all_queries[:RETRIEVAL_QUERY_COUNT]
-    if len(retrieval_queries) < RETRIEVAL_QUERY_COUNT:
-        print(f"Warning: Only {len(retrieval_queries)} queries available. Using all of them.")
-    
-    # 2. Initialize HippoRAG (Clean start)
-    if os.path.exists(SAVE_DIR):
-        shutil.rmtree(SAVE_DIR)
-        
+    print(f"Error: Data path not found. Checked: {[str(p) for p in possible_paths]}")
+    return None
+
+def build_rag(save_dir: str, base_url: str, strategy: Optional[str] = None):
+    """Create a HippoRAG instance with our OpenRouter embedding model injected into all stores."""
     print("Initializing HippoRAG with custom config...")
     config = BaseConfig()
-    config.embedding_batch_size = 8 # Reduce from default 16 for better OpenRouter stability
-    config.llm_name = "meta-llama/llama-3.3-70b-instruct"
-    config.llm_base_url = "https://openrouter.ai/api/v1"
-    config.embedding_model_name = "openai/text-embedding-3-small"
-    config.embedding_base_url = "https://openrouter.ai/api/v1"
-    config.save_dir = SAVE_DIR
+    config.embedding_batch_size = EMBEDDING_BATCH_SIZE
+    config.embedding_concurrency = EMBEDDING_CONCURRENCY
+    config.embedding_token_budget = EMBEDDING_TOKEN_BUDGET
+    config.llm_name = LLM_NAME
+    config.llm_base_url = base_url
+    config.embedding_model_name = EMBEDDING_MODEL_NAME
+    config.embedding_base_url = base_url
+    config.save_dir = save_dir
+    # Synthetic vectors must never be served as real ones, so the offline backend gets its own cache
+    config.embedding_cache_dir = os.path.join(EMBEDDING_CACHE_DIR, "offline") if OFFLINE_BACKEND else EMBEDDING_CACHE_DIR
+    if strategy is not None and len(INDEXING_STRATEGIES) > 1:
+        # A shared cache would serve every strategy after the first all its embeddings as hits
+        config.embedding_cache_dir = os.path.join(config.embedding_cache_dir, strategy)
 
     rag = HippoRAG(global_config=config)
-    
+
     # Inject generic OpenRouter embedding model to fix "NoneType" error in openai client
     print("Injecting custom OpenRouterEmbeddingModel...")
     custom_embedding_model = OpenRouterEmbeddingModel(global_config=config)
@@ -106,46 +165,289 @@ def main():
     if hasattr(rag, 'chunk_embedding_store'): rag.chunk_embedding_store.embedding_model = custom_embedding_model
     if hasattr(rag, 'entity_embedding_store'): rag.entity_embedding_store.embedding_model = custom_embedding_model
     if hasattr(rag, 'fact_embedding_store'): rag.fact_embedding_store.embedding_model = custom_embedding_model
-    
-    dataset_results = []
-    
-    cumulative_indexing_time = 0.0
-    current_doc_count = 0
-    current_query_index = 0
-    
-    
+    if EMBEDDING_STORE_DTYPE:
+        print(f"Switching embedding stores to memory-mapped {EMBEDDING_STORE_DTYPE}...")
+        quantized_store.install(rag, EMBEDDING_STORE_DTYPE)
+    return rag, custom_embedding_model
+
+def make_index_batches(doc_texts: List[str], strategy: str, micro_batch_size: Optional[int] = None) -> List[List[str]]:
+    """Split one step's new documents into the arguments of successive rag.index calls."""
+    micro_batch_size = micro_batch_size or MICRO_BATCH_SIZE
+    if strategy == "per_document":
+        return [[doc_text] for doc_text in doc_texts]
+    if strategy == "micro_batch":
+        return [doc_texts[i:i + micro_batch_size] for i in range(0, len(doc_texts), micro_batch_size)]
+    if strategy == "bulk":
+        return [doc_texts] if doc_texts else []
+    raise ValueError(f"Unknown indexing strategy '{strategy}', expected one of {INDEXING_STRATEGY_NAMES}")
+
+def index_documents(rag, doc_texts: List[str], strategy: str, memory_tracker: MemoryTracker) -> Dict[str, Any]:
+    """
+    Index `doc_texts` using `strategy` and return per-call statistics.
+
+    The memory ceiling is checked after every rag.index call; once it is
+    exceeded the remaining batches are skipped and `stopped` is set.
+    `attempted` counts the documents handed to rag.index so far.
+    """
+    call_times = []
+    failed_calls = 0
+    attempted = 0
+    stopped = False
+    for batch in make_index_batches(doc_texts, strategy):
+        call_start = time.time()
+        try:
+            rag.index(batch)
+        except Exception as e:
+            failed_calls += 1
+            print(f"\n[ERROR] Failed to index documents {attempted}-{attempted + len(batch) - 1}: {e}. Skipping...")
+        call_times.append(time.time() - call_start)
+        attempted += len(batch)
+        if memory_tracker.over_ceiling():
+            stopped = True
+            break
+    return {
+        "attempted": attempted,
+        "index_calls": len(call_times),
+        "failed_calls": failed_calls,
+        "avg_index_call_time_s": float(np.mean(call_times)) if call_times else 0.0,
+        "max_index_call_time_s": float(np.max(call_times)) if call_times else 0.0,
+        "stopped": stopped,
+    }
+
+def run_retrieval_benchmark(rag, query_stream) -> List[Dict[str, Any]]:
+    """
+    Closed-loop runs for every RETRIEVAL_CONCURRENCY and open-loop runs for every arrival rate.
+
+    Each run takes fresh queries from `query_stream` because HippoRAG keeps query
+    embeddings in `query_to_embedding` (only `prepare_retrieval_objects` clears
+    them), which would make repeated queries faster.
+    """
+    def next_queries(count: int) -> List[str]:
+        return list(itertools.islice(query_stream, count))
+
+    generator = RetrievalLoadGenerator(lambda query: rag.retrieve([query]))
+    warmup_errors = generator.warmup(next_queries(RETRIEVAL_WARMUP_QUERIES))
+    if warmup_errors:
+        print(f"Warning: {warmup_errors} warmup queries failed.")
+
+    runs = []
+    for concurrency in RETRIEVAL_CONCURRENCY:
+        runs.append(generator.run_closed_loop(next_queries(RETRIEVAL_BENCHMARK_QUERIES), concurrency))
+    for rate in RETRIEVAL_ARRIVAL_RATES_QPS:
+        runs.append(generator.run_open_loop(next_queries(RETRIEVAL_BENCHMARK_QUERIES), rate))
+
+    for run in runs:
+        load = f"concurrency {run['concurrency']}" if run["mode"] == "closed_loop" else f"{run['arrival_rate_qps']} qps arrivals"
+        if "p50_ms" in run:
+            print(f"  {load}: p50 {run['p50_ms']:.0f} ms, p95 {run['p95_ms']:.0f} ms, p99 {run['p99_ms']:.0f} ms, "
+                  f"{run['throughput_qps']:.2f} qps, {run['errors']} errors")
+        else:
+            print(f"  {load}: all {run['errors']} requests failed")
+    return runs
+
+def queries_per_step() -> int:
+    """Distinct queries one step consumes: rag_qa (reused by the dense baseline) plus the retrieval benchmarks."""
+    count = RETRIEVAL_QUERY_COUNT
+    if RETRIEVAL_BENCHMARK:
+        count += RETRIEVAL_WARMUP_QUERIES
+        count += RETRIEVAL_BENCHMARK_QUERIES * (len(RETRIEVAL_CONCURRENCY) + len(RETRIEVAL_ARRIVAL_RATES_QPS))
+    if RETRIEVAL_BATCH_SIZES:
+        count += RETRIEVAL_BATCH_QUERIES * len(RETRIEVAL_BATCH_SIZES)
+    return count
+
+def write_results(results: List[Dict[str, Any]]):
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump(results, f, indent=2)
+
+def checkpoint_path(save_dir: str) -> str:
+    # Next to the save dir rather than inside it, so HippoRAG never sees it as part of its index
+    return os.path.normpath(save_dir) + ".checkpoint.json"
+
+def load_checkpoint(save_dir: str) -> Optional[Dict[str, Any]]:
+    path = checkpoint_path(save_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_checkpoint(save_dir: str, state: Dict[str, Any]):
+    """Write the checkpoint atomically so a crash mid-write keeps the previous one."""
+    path = checkpoint_path(save_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def run_strategy(strategy: str, all_docs, all_queries: List[str], base_url: str, offline_server,
+                 memory_tracker: MemoryTracker, dataset_results: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Run the scaling loop for one indexing strategy in its own save dir.
+
+    Step results are appended to `dataset_results` and flushed to RESULTS_FILE
+    as they complete. Returns the reason the run stopped early, if any.
+    """
+    save_dir = SAVE_DIR if len(INDEXING_STRATEGIES) == 1 else os.path.join(SAVE_DIR, strategy)
+    print(f"\n##### Indexing strategy: {strategy} #####")
+
+    checkpoint = load_checkpoint(save_dir) if RESUME else None
+    if checkpoint is not None and checkpoint["strategy"] != strategy:
+        raise ValueError(f"Checkpoint {checkpoint_path(save_dir)} belongs to strategy '{checkpoint['strategy']}', not '{strategy}'")
+
+    if checkpoint is None:
+        # 2. Initialize HippoRAG (Clean start)
+        if os.path.exists(save_dir):
+            shutil.rmtree(save_dir)
+        if os.path.exists(checkpoint_path(save_dir)):
+            os.remove(checkpoint_path(save_dir))
+        checkpoint = {
+            "strategy": strategy,
+            "document_count": 0,
+            "query_index": 0,
+            "cumulative_indexing_time_s": 0.0,
+            "resume_count": 0,
+            "completed": False,
+            "results": [],
+        }
+    else:
+        # 2. Initialize HippoRAG from the existing save dir; HippoRAG reloads its graph, stores and OpenIE results
+        dataset_results.extend(checkpoint["results"])
+        if checkpoint["completed"]:
+            print("Strategy already completed, nothing to resume.")
+            return None
+        checkpoint["resume_count"] += 1
+        save_checkpoint(save_dir, checkpoint)
+        print(f"Resuming from checkpoint at {checkpoint['document_count']} documents "
+              f"(resume #{checkpoint['resume_count']}, {checkpoint['cumulative_indexing_time_s']:.2f}s indexed so far)")
+
+    rag, custom_embedding_model = build_rag(save_dir, base_url, strategy)
+    ann_patch = synonymy_ann.install(rag, nprobe=SYNONYMY_ANN_NPROBE) if SYNONYMY_ANN else None
+    graph_patch = incremental_graph.install(rag) if INCREMENTAL_GRAPH else None
+    if graph_patch is not None:
+        ann_patch = rag.synonymy_ann # Reported even when the graph patch installed it
+    ppr_engine = sparse_ppr.install(rag) if PPR_ENGINE == "sparse" else None
+    ppr_benchmark_engine = None
+    if PPR_BENCHMARK_QUERIES:
+        # Without the patch, a standalone engine over the same graph serves the comparison
+        ppr_benchmark_engine = ppr_engine or sparse_ppr.SparsePPR(rag.graph)
+
+    # Attribute each step's cost to OpenIE, embedding, graph construction, persistence, ...
+    profiler = PhaseProfiler(PROFILE_FILE)
+    profiler.instrument_hipporag(rag)
+    profiler.instrument_embedding_model(custom_embedding_model)
+
+    dense_baseline = None
+    if DENSE_BASELINE:
+        if checkpoint["document_count"] > 0:
+            print("Dense baseline disabled for resumed runs (its index is not checkpointed).")
+        else:
+            # A model instance of its own keeps the baseline's requests out of HippoRAG's phase profile; it shares
+            # the open embedding cache (cache_dir="" skips loading a second copy), so its cost stays the index structure
+            baseline_model = OpenRouterEmbeddingModel(global_config=rag.global_config, cache_dir="")
+            baseline_model.cache = custom_embedding_model.cache
+            dense_baseline = NumpyDenseRetriever(baseline_model.batch_encode, dtype=DENSE_BASELINE_DTYPE)
+    baseline_indexing_time = 0.0
+
+    stop_reason = None
+
+    cumulative_indexing_time = checkpoint["cumulative_indexing_time_s"]
+    current_doc_count = checkpoint["document_count"]
+    current_query_index = checkpoint["query_index"]
+    resume_count = checkpoint["resume_count"]
+
+
+    if isinstance(all_docs, DocumentStream):
+        doc_iter = iter(all_docs.with_offset(current_doc_count))
+    else:
+        doc_iter = iter(all_docs[current_doc_count:])
+
     # 3. Experiment Loop
     for target_count in SUBSETS:
-        if target_count > len(all_docs):
-            print(f"Stopping: Target count {target_count} exceeds available documents ({len(all_docs)}).")
-            break
-            
-        print(f"\n=== Step: Target {target_count} documents ===")
-        
+        if target_count <= checkpoint["document_count"]:
+            continue # Completed before the resume
+
         # Identify new documents to index
-        new_docs = all_docs[current_doc_count:target_count]
+        new_docs = list(itertools.islice(doc_iter, max(target_count - current_doc_count, 0)))
+        if current_doc_count + len(new_docs) < target_count:
+            print(f"Stopping: Target count {target_count} exceeds available documents ({current_doc_count + len(new_docs)}).")
+            break
+
+        print(f"\n=== Step: Target {target_count} documents ({strategy}) ===")
+
         new_doc_texts = [f"{d.title}\n{d.text}" for d in new_docs]
-        
+        for d in new_docs:
+            if isinstance(d, LazyDocument):
+                d.release() # HippoRAG keeps its own copy of the text
+
+        index_stats = None
+        step_time = 0.0
         # Skip if no new docs (e.g. if SUBSETS has duplicates or logic error)
         if not new_doc_texts:
             print("No new documents to index this step.")
         else:
             print(f"Indexing {len(new_doc_texts)} new documents...")
             step_start_time = time.time()
-            for i, doc_text in enumerate(new_doc_texts):
-                try:
-                    rag.index([doc_text])
-                except Exception as e:
-                    print(f"\n[ERROR] Failed to index document {i}: {e}. Skipping...")
-            
+            index_stats = index_documents(rag, new_doc_texts, strategy, memory_tracker)
+            if graph_patch is not None:
+                graph_patch.flush()
+
             step_end_time = time.time()
             step_time = step_end_time - step_start_time
             cumulative_indexing_time += step_time
-            print(f"Indexing Step Time: {step_time:.2f}s")
-            
+            print(f"Indexing Step Time: {step_time:.2f}s ({index_stats['index_calls']} index calls, "
+                  f"{index_stats['avg_index_call_time_s']:.2f}s per call)")
+
+            if index_stats["stopped"]:
+                stop_reason = "memory_ceiling"
+                target_count = current_doc_count + index_stats["attempted"]
+                print(f"\n[STOP] RSS exceeded the {MEMORY_CEILING_GB} GB ceiling after {target_count} documents.")
+
         print(f"Total Indexing Time (Cumulative): {cumulative_indexing_time:.2f}s")
         current_doc_count = target_count
-        
+
+        if stop_reason is not None:
+            # Flush what we have for the partial step and skip retrieval, which would only allocate more
+            # The checkpoint stays at the last completed subset; a resume re-runs this step, and HippoRAG
+            # skips the chunks already indexed here.
+            dataset_results.append({
+                "indexing_strategy": strategy,
+                "document_count": current_doc_count,
+                "total_indexing_time_s": cumulative_indexing_time,
+                "resumed": resume_count > 0,
+                "resume_count": resume_count,
+                "stopped_reason": stop_reason,
+                "memory": memory_tracker.sample(rag),
+            })
+            write_results(dataset_results)
+            break
+
+        baseline_result = None
+        if dense_baseline is not None:
+            baseline_start = time.time()
+            dense_baseline.add_texts(new_doc_texts, [d.id for d in new_docs])
+            baseline_step_time = time.time() - baseline_start
+            baseline_indexing_time += baseline_step_time
+            baseline_result = {
+                "total_indexing_time_s": baseline_indexing_time,
+                "step_indexing_time_s": baseline_step_time,
+                "rows": len(dense_baseline),
+                "matrix_mb": dense_baseline.nbytes / 1024**2,
+            }
+
+        # HippoRAG's index() never clears ready_to_retrieve, so without this every query after the first step
+        # would score against the matrices built then. The incremental graph patch extends them in place instead.
+        if new_doc_texts and graph_patch is None:
+            rag.ready_to_retrieve = False
+        retrieval_prepare_time = None
+        if not rag.ready_to_retrieve:
+            print("Preparing retrieval objects...")
+            prepare_start = time.time()
+            try:
+                rag.prepare_retrieval_objects()
+            except Exception as e:
+                print(f"Error preparing retrieval objects: {e}")
+            retrieval_prepare_time = time.time() - prepare_start
+            print(f"Retrieval Prepare Time: {retrieval_prepare_time:.2f}s")
+
         # Retrieval
         # Select next batch of queries
         step_queries = all_queries[current_query_index : current_query_index + RETRIEVAL_QUERY_COUNT]
@@ -159,7 +461,7 @@ def main():
 
         print(f"Running Retrieval on {len(step_queries)} queries...")
         retrieval_times = []
-        
+
         for i, query in enumerate(step_queries):
             r_start = time.time()
             try:
@@ -168,26 +470,252 @@ def main():
                 print(f"Error querying '{query}': {e}")
             r_end = time.time()
             retrieval_times.append(r_end - r_start)
-            
+
             if (i+1) % 10 == 0:
                 print(f"  Processed {i+1}/{len(step_queries)} queries...", end='\r')
-                
+
         avg_retrieval_time = np.mean(retrieval_times) if retrieval_times else 0.0
         print(f"\nAverage Retrieval Time: {avg_retrieval_time:.4f}s")
-        
+
+        if baseline_result is not None:
+            baseline_times = []
+            for query in step_queries:
+                b_start = time.time()
+                dense_baseline.retrieve(query)
+                baseline_times.append(time.time() - b_start)
+            baseline_result["avg_retrieval_time_s"] = float(np.mean(baseline_times)) if baseline_times else 0.0
+            print(f"Dense baseline: {baseline_result['total_indexing_time_s']:.2f}s cumulative indexing, "
+                  f"{baseline_result['avg_retrieval_time_s']:.4f}s average retrieval")
+
+        # Queries after this step's rag_qa ones, shared by the benchmarks below so none of them repeats a query.
+        # The index then moves past them too: HippoRAG keeps every query embedding it computed (and the embedding
+        # cache stores them), so the next step's rag_qa queries must not have been benchmarked already.
+        benchmark_queries_used = itertools.count()
+        query_stream = (query for query, _ in zip(
+            itertools.islice(itertools.cycle(all_queries), current_query_index, None), benchmark_queries_used))
+
+        retrieval_benchmark = None
+        if RETRIEVAL_BENCHMARK and all_queries:
+            print("Running retrieval load benchmark (retrieve only)...")
+            retrieval_benchmark = run_retrieval_benchmark(rag, query_stream)
+
+        batched_retrieval = None
+        if RETRIEVAL_BATCH_SIZES and all_queries:
+            print(f"Running batched retrieval for batch sizes {RETRIEVAL_BATCH_SIZES}...")
+            batch_queries = list(itertools.islice(query_stream, RETRIEVAL_BATCH_QUERIES * len(RETRIEVAL_BATCH_SIZES)))
+            batched_retrieval = measure_batch_sizes(rag, batch_queries, RETRIEVAL_BATCH_SIZES)
+            for run in batched_retrieval:
+                print(f"  batch size {run['batch_size']}: {run['per_query_ms']:.0f} ms/query, {run['per_batch_ms']:.0f} ms/batch")
+
+        if all_queries:
+            current_query_index = (current_query_index + next(benchmark_queries_used)) % len(all_queries)
+
+        ppr_benchmark = None
+        if ppr_benchmark_engine is not None and rag.ready_to_retrieve and rag.graph.ecount() > 0:
+            # Reset vectors of this step's real queries when the engine saw them, synthetic ones otherwise
+            resets = [r for r in ppr_benchmark_engine.recent_resets if len(r) == rag.graph.vcount()]
+            resets = resets[-PPR_BENCHMARK_QUERIES:]
+            resets = np.column_stack(resets) if resets else sparse_ppr.synthetic_resets(rag, PPR_BENCHMARK_QUERIES)
+            ppr_benchmark = sparse_ppr.benchmark_against_igraph(rag, ppr_benchmark_engine, resets)
+            print(f"PPR: igraph {ppr_benchmark['igraph_ms_per_query']:.2f} ms/query, sparse "
+                  f"{ppr_benchmark['sparse_ms_per_query']:.2f} ms/query "
+                  f"({ppr_benchmark['sparse_batched_ms_per_query']:.2f} batched), "
+                  f"top-{ppr_benchmark['k']} agreement {ppr_benchmark['topk_agreement']:.3f}")
+
         # Log Result
         result = {
+            "indexing_strategy": strategy,
             "document_count": target_count,
             "total_indexing_time_s": cumulative_indexing_time,
+            "step_indexing_time_s": step_time,
             "avg_retrieval_time_s": avg_retrieval_time,
-            "queries_run": len(retrieval_times)
+            "queries_run": len(retrieval_times),
+            # Rebuilding the retrieval matrices after this step's indexing; in neither the indexing nor the query times
+            "retrieval_prepare_time_s": retrieval_prepare_time,
+            # Cumulative times of resumed runs include steps timed in an earlier process
+            "resumed": resume_count > 0,
+            "resume_count": resume_count,
         }
+        if retrieval_benchmark is not None:
+            result["retrieval_benchmark"] = retrieval_benchmark
+        if batched_retrieval is not None:
+            result["batched_retrieval"] = batched_retrieval
+        if baseline_result is not None:
+            result["dense_baseline"] = baseline_result
+        if ppr_benchmark is not None:
+            result["ppr_benchmark"] = ppr_benchmark
+        if ppr_engine is not None:
+            result["sparse_ppr"] = ppr_engine.stats()
+        if ann_patch is not None:
+            result["synonymy_ann"] = ann_patch.stats()
+            if SYNONYMY_ANN_RECALL_SAMPLE:
+                result["synonymy_ann"]["recall_check"] = ann_patch.recall(SYNONYMY_ANN_RECALL_SAMPLE)
+            print(f"Synonymy ANN: {result['synonymy_ann']}")
+        if graph_patch is not None:
+            result["incremental_graph"] = graph_patch.stats()
+        if index_stats is not None:
+            result["index_calls"] = index_stats["index_calls"]
+            result["failed_index_calls"] = index_stats["failed_calls"]
+            result["avg_index_call_time_s"] = index_stats["avg_index_call_time_s"]
+            result["max_index_call_time_s"] = index_stats["max_index_call_time_s"]
+            result["per_document_indexing_time_s"] = step_time / len(new_doc_texts)
+        if custom_embedding_model.cache is not None:
+            result["embedding_cache"] = custom_embedding_model.cache.stats()
+            print(f"Embedding cache: {result['embedding_cache']}")
+        if offline_server is not None:
+            result["offline_backend"] = {"mode": OFFLINE_MODE, **offline_server.request_counts}
+        result["memory"] = memory_tracker.sample(rag)
+        print(f"Memory: RSS {result['memory']['rss_mb']:.0f} MB (peak {result['memory']['peak_rss_mb']:.0f} MB), "
+              f"graph {result['memory'].get('graph')}")
+
+        profile_record = profiler.write_step({"indexing_strategy": strategy, "document_count": target_count,
+                                              "new_documents": len(new_doc_texts)})
+        print("Top phases this step:")
+        for line in PhaseProfiler.summarize(profile_record):
+            print(f"  {line}")
         dataset_results.append(result)
-        
+
         # Save intermediate results
-        with open(RESULTS_FILE, 'w') as f:
-            json.dump(dataset_results, f, indent=2)
-            
+        write_results(dataset_results)
+        checkpoint.update({
+            "document_count": target_count,
+            "query_index": current_query_index,
+            "cumulative_indexing_time_s": cumulative_indexing_time,
+        })
+        checkpoint["results"].append(result)
+        save_checkpoint(save_dir, checkpoint)
+
+    if stop_reason is None:
+        checkpoint["completed"] = True
+        save_checkpoint(save_dir, checkpoint)
+    return stop_reason
+
+def print_strategy_comparison(dataset_results: List[Dict[str, Any]]):
+    """Cumulative indexing time per document count, one column per strategy."""
+    strategies = list(dict.fromkeys(r["indexing_strategy"] for r in dataset_results))
+    if len(strategies) < 2:
+        return
+    by_count: Dict[int, Dict[str, float]] = {}
+    for r in dataset_results:
+        by_count.setdefault(r["document_count"], {})[r["indexing_strategy"]] = r["total_indexing_time_s"]
+
+    print("\n--- Indexing strategy comparison (cumulative indexing time, s) ---")
+    print("docs".rjust(8) + "".join(s.rjust(16) for s in strategies))
+    for count in sorted(by_count):
+        row = by_count[count]
+        print(str(count).rjust(8) + "".join((f"{row[s]:.1f}" if s in row else "-").rjust(16) for s in strategies))
+
+def print_per_document_cost(dataset_results: List[Dict[str, Any]]):
+    """Per-document indexing time of every step; a flat column means indexing cost does not grow with the corpus."""
+    steps = [r for r in dataset_results if "per_document_indexing_time_s" in r]
+    if not steps:
+        return
+    print("\n--- Per-document indexing cost by step (ms) ---")
+    print("strategy".rjust(14) + "docs".rjust(8) + "ms/doc".rjust(12) + "vs first".rjust(10))
+    first: Dict[str, float] = {}
+    for r in steps:
+        cost_ms = 1000.0 * r["per_document_indexing_time_s"]
+        base = first.setdefault(r["indexing_strategy"], cost_ms)
+        ratio = f"{cost_ms / base:.2f}x" if base > 0 else "-"
+        print(r["indexing_strategy"].rjust(14) + str(r["document_count"]).rjust(8) + f"{cost_ms:.1f}".rjust(12) + ratio.rjust(10))
+
+def config_names() -> List[str]:
+    """The module-level settings above; these are what a config file or --set may override."""
+    return [name for name, value in globals().items()
+            if name.isupper() and name != "INDEXING_STRATEGY_NAMES" and not callable(value)]
+
+def apply_overrides(overrides: Dict[str, Any]):
+    """Replace settings for this process, e.g. one cell of run_matrix.py."""
+    known = config_names()
+    unknown = sorted(set(overrides) - set(known))
+    if unknown:
+        raise ValueError(f"Unknown setting(s) {unknown}, expected some of {sorted(known)}")
+    for name, value in overrides.items():
+        globals()[name] = value
+        print(f"Config override: {name} = {value!r}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="HippoRAG scaling experiment; settings default to the constants in this file")
+    parser.add_argument("--config", help="JSON file of setting overrides, e.g. {\"SUBSETS\": [10, 20], \"OFFLINE_BACKEND\": true}")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                        help="Override one setting (applied after --config); VALUE is parsed as JSON")
+    args = parser.parse_args(argv)
+    apply_overrides(load_overrides(args.config, args.settings))
+
+    print("--- Starting HippoRAG Scaling Experiment ---")
+    setup_env()
+
+    # 1. Load Data
+    final_data_path = Path(STREAM_SOURCE) if STREAM_DOCUMENTS and STREAM_SOURCE else find_data_path()
+    if not final_data_path:
+        return
+
+    if STREAM_DOCUMENTS:
+        print(f"Streaming documents from: {final_data_path}")
+        all_docs = DocumentStream(final_data_path, lazy=LAZY_DOCUMENTS)
+        # Only as many questions as the run can ask are kept in memory
+        query_limit = len(SUBSETS) * queries_per_step()
+        all_queries = [qa.question for qa in itertools.islice(all_docs.iter_qa_pairs(), query_limit)]
+    else:
+        print(f"Loading data from: {final_data_path}")
+        load_start = time.time()
+        if USE_CORPUS_CACHE:
+            dataset = DataSet.from_cache(final_data_path)
+        else:
+            dataset = DataSet(final_data_path, workers=DATASET_WORKERS, lazy=LAZY_DOCUMENTS)
+        all_docs = dataset.documents
+        print(f"Total documents available: {len(all_docs)} (loaded in {time.time() - load_start:.2f}s)")
+
+        # Prepare queries
+        all_queries = []
+        if dataset.qa_pairs:
+            all_queries = [qa.question for qa in dataset.qa_pairs]
+
+    retrieval_queries = all_queries[:RETRIEVAL_QUERY_COUNT]
+    if len(retrieval_queries) < RETRIEVAL_QUERY_COUNT:
+        print(f"Warning: Only {len(retrieval_queries)} queries available. Using all of them.")
+
+    for strategy in INDEXING_STRATEGIES:
+        make_index_batches([], strategy) # Fail on typos before any documents are indexed
+    if PPR_ENGINE not in ("igraph", "sparse"):
+        raise ValueError(f"Unknown PPR engine '{PPR_ENGINE}'")
+
+    base_url = "https://openrouter.ai/api/v1"
+    offline_server = None
+    if OFFLINE_BACKEND:
+        offline_server = OfflineOpenAIServer(
+            mode=OFFLINE_MODE,
+            record_path=OFFLINE_RECORD_PATH if OFFLINE_MODE != "synthetic" else None,
+            latency_ms=OFFLINE_LATENCY_MS,
+            latency_jitter_ms=OFFLINE_LATENCY_JITTER_MS,
+        ).start()
+        base_url = offline_server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "offline") # The openai client refuses to start without a key
+        print(f"Using offline backend ({OFFLINE_MODE}) at {base_url}")
+
+    if os.path.exists(PROFILE_FILE) and not RESUME:
+        os.remove(PROFILE_FILE)
+
+    memory_tracker = MemoryTracker(
+        ceiling_bytes=int(MEMORY_CEILING_GB * 1024**3) if MEMORY_CEILING_GB else None,
+        track_allocations=TRACK_ALLOCATIONS,
+    )
+
+    dataset_results = []
+    for strategy in INDEXING_STRATEGIES:
+        stop_reason = run_strategy(strategy, all_docs, all_queries, base_url, offline_server,
+                                   memory_tracker, dataset_results)
+        if stop_reason == "memory_ceiling":
+            # The remaining strategies would start in the same, already full, process
+            print("Skipping remaining strategies after hitting the memory ceiling.")
+            break
+
+    print_strategy_comparison(dataset_results)
+    print_per_document_cost(dataset_results)
+
+    memory_tracker.stop()
+    if offline_server is not None:
+        offline_server.stop()
     print(f"\nExperiment Completed. Results saved to {RESULTS_FILE}")
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+import sys
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+MB = 1024 * 1024
+
+
+def _read_proc_status() -> Dict[str, int]:
+    """VmRSS/VmHWM from /proc/self/status in bytes (Linux only, empty elsewhere)."""
+    values = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, amount, _unit = line.split()
+                    values[key.rstrip(":")] = int(amount) * 1024
+    except OSError:
+        pass
+    return values
+
+
+def current_rss_bytes() -> int:
+    status = _read_proc_status()
+    if "VmRSS" in status:
+        return status["VmRSS"]
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        # Without /proc or psutil the peak is the best available approximation
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    status = _read_proc_status()
+    if "VmHWM" in status:
+        return status["VmHWM"]
+    import resource  # not available on Windows, where /proc is missing too
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def embedding_store_footprint(store: Any) -> Dict[str, Any]:
+    """Row count, dimension and vector bytes of a HippoRAG EmbeddingStore."""
+    if hasattr(store, "footprint"):
+        return store.footprint() # Memory-mapped stores report their file size separately
+    embeddings = getattr(store, "embeddings", None)
+    if embeddings is None:
+        return {"rows": 0, "dim": 0, "embedding_mb": 0.0}
+    rows = len(embeddings)
+    dim = len(embeddings[0]) if rows else 0
+    nbytes = getattr(embeddings, "nbytes", None)
+    if nbytes is None:
+        nbytes = sum(getattr(e, "nbytes", 0) for e in embeddings)
+    return {"rows": rows, "dim": dim, "embedding_mb": nbytes / MB}
+
+
+class MemoryTracker:
+    """
+    Samples process and HippoRAG memory at each experiment step.
+
+    Each sample holds current and peak RSS, the size of the chunk/entity/fact
+    embedding stores and the graph's node/edge counts, plus the tracemalloc
+    totals and top allocating source lines when `track_allocations` is on (off
+    by default, since tracing slows Python-heavy code). `over_ceiling()` is
+    cheap (one read of /proc) so the experiment can check it after every
+    indexed document and stop cleanly instead of being OOM-killed.
+    """
+
+    def __init__(self, ceiling_bytes: Optional[int] = None, track_allocations: bool = False, top_n: int = 10):
+        self.ceiling_bytes = ceiling_bytes
+        self.track_allocations = track_allocations
+        self.top_n = top_n
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def over_ceiling(self) -> bool:
+        return self.ceiling_bytes is not None and current_rss_bytes() > self.ceiling_bytes
+
+    def sample(self, rag: Any = None) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "rss_mb": current_rss_bytes() / MB,
+            "peak_rss_mb": peak_rss_bytes() / MB,
+        }
+        if self.ceiling_bytes is not None:
+            result["ceiling_mb"] = self.ceiling_bytes / MB
+
+        if self.track_allocations and tracemalloc.is_tracing():
+            traced_current, traced_peak = tracemalloc.get_traced_memory()
+            result["tracemalloc_current_mb"] = traced_current / MB
+            result["tracemalloc_peak_mb"] = traced_peak / MB
+            result["top_allocators"] = self._top_allocators()
+
+        if rag is not None:
+            result["embedding_stores"] = {
+                label: embedding_store_footprint(getattr(rag, attr))
+                for attr, label in (("chunk_embedding_store", "chunks"),
+                                    ("entity_embedding_store", "entities"),
+                                    ("fact_embedding_store", "facts"))
+                if getattr(rag, attr, None) is not None
+            }
+            graph = getattr(rag, "graph", None)
+            if graph is not None:
+                result["graph"] = {"nodes": graph.vcount(), "edges": graph.ecount()}
+        return result
+
+    def stop(self) -> None:
+        if self.track_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _top_allocators(self) -> List[Dict[str, Any]]:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_mb": stat.size / MB,
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[:self.top_n]
+        ]
@@ -0,0 +1,113 @@
+import threading
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from data_classes.documents import Document
+from data_classes.qa import QuestionAnswerPair
+from data_classes.rag_system import Chunk
+
+
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+class NumpyDenseRetriever:
+    """
+    Plain dense retrieval baseline implementing both `Indexer` and `Retriever`.
+
+    One chunk per document, embedded with `embed_fn` (a batch encoder such as
+    `OpenRouterEmbeddingModel.batch_encode`). Rows are L2-normalized on insert
+    and kept in one contiguous matrix that doubles its capacity when full, so
+    appending is amortized O(1) and a query costs one matrix-vector product plus
+    an `argpartition` top-k. `dtype=np.float16` halves memory; scoring then
+    upcasts `block_rows` rows at a time.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], np.ndarray], dtype=np.float32,
+                 initial_capacity: int = 1024, block_rows: int = 65536):
+        self.embed_fn = embed_fn
+        self.dtype = np.dtype(dtype)
+        self.initial_capacity = initial_capacity
+        self.block_rows = block_rows
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self.chunk_ids: List[str] = []
+        self.texts: List[str] = []
+        self.doc_ids: List[Optional[str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes if self._matrix is not None else 0
+
+    def index(self, document: Document) -> None:
+        self.add_texts([f"{document.title}\n{document.text}"], [document.id])
+
+    def add_texts(self, texts: Sequence[str], doc_ids: Optional[Sequence[Optional[str]]] = None) -> None:
+        """Embed `texts` in one `embed_fn` call and append them."""
+        if not texts:
+            return
+        embeddings = _normalize_rows(np.asarray(self.embed_fn(list(texts)), dtype=np.float32))
+        doc_ids = list(doc_ids) if doc_ids is not None else [None] * len(texts)
+        with self._lock:
+            self._reserve(self._size + len(texts), embeddings.shape[1])
+            self._matrix[self._size:self._size + len(texts)] = embeddings
+            start = self._size
+            self._size += len(texts)
+            self.chunk_ids.extend(f"chunk-{i}" for i in range(start, self._size))
+            self.texts.extend(texts)
+            self.doc_ids.extend(doc_ids)
+
+    def retrieve(self, question: str, k: int = 5, qa_pair: Optional[QuestionAnswerPair] = None) -> List[Chunk]:
+        return self.retrieve_many([question], k)[0]
+
+    def retrieve_many(self, questions: Sequence[str], k: int = 5) -> List[List[Chunk]]:
+        """Top-k chunks for every question; all of them are scored with one matrix product."""
+        if self._size == 0 or not questions:
+            return [[] for _ in questions]
+        queries = _normalize_rows(np.asarray(self.embed_fn(list(questions)), dtype=np.float32))
+        scores = self._scores(queries) # (#questions, #rows)
+        k = min(k, self._size)
+
+        results = []
+        for row in scores:
+            top = np.argpartition(row, -k)[-k:]
+            top = top[np.argsort(row[top])[::-1]]
+            results.append([
+                Chunk(chunk_id=self.chunk_ids[i], text=self.texts[i], score=float(row[i]), doc_id=self.doc_ids[i])
+                for i in top
+            ])
+        return results
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        matrix = self._matrix[:self._size]
+        if self.dtype == np.float32:
+            return queries @ matrix.T
+        # Half-precision matmuls have no BLAS path; upcast in blocks to keep the temporary bounded
+        scores = np.empty((len(queries), self._size), dtype=np.float32)
+        for start in range(0, self._size, self.block_rows):
+            block = matrix[start:start + self.block_rows].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        if self._matrix is None:
+            capacity = max(self.initial_capacity, rows)
+            self._matrix = np.empty((capacity, dim), dtype=self.dtype)
+            return
+        if self._matrix.shape[1] != dim:
+            raise ValueError(f"Embedding dimension changed from {self._matrix.shape[1]} to {dim}")
+        capacity = len(self._matrix)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        grown = np.empty((capacity, dim), dtype=self.dtype)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
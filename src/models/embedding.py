@@ -1,13 +1,20 @@
 import os
 import time
 import numpy as np
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
 from openai import OpenAI
 from hipporag.embedding_model.base import BaseEmbeddingModel
 from hipporag.utils.config_utils import BaseConfig
 
+from .embedding_cache import EmbeddingCache
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English BPE vocabularies)."""
+    return max(1, len(text) // 4)
+
 class OpenRouterEmbeddingModel(BaseEmbeddingModel):
-    def __init__(self, global_config: Optional[BaseConfig] = None, model_name: str = "openai/text-embedding-3-small"):
+    def __init__(self, global_config: Optional[BaseConfig] = None, model_name: str = "openai/text-embedding-3-small", cache_dir: Optional[str] = None):
         # Initialize parent
         super().__init__(global_config=global_config)
         
@@ -49,6 +56,24 @@ class OpenRouterEmbeddingModel(BaseEmbeddingModel):
             api_key=self.api_key,
         )
 
+        # Optional persistent embedding cache: explicit arg > config
+        if cache_dir is None and self.global_config:
+            cache_dir = getattr(self.global_config, "embedding_cache_dir", None)
+        self.cache: Optional[EmbeddingCache] = None
+        if cache_dir:
+            max_entries = getattr(self.global_config, "embedding_cache_max_entries", None) or 1_000_000
+            self.cache = EmbeddingCache(cache_dir, self.model_name, max_entries=max_entries)
+
+        # Number of embedding requests kept in flight by batch_encode (1 = sequential)
+        self.concurrency = 1
+        if self.global_config and getattr(self.global_config, "embedding_concurrency", None):
+            self.concurrency = max(1, int(self.global_config.embedding_concurrency))
+
+        # Optional token-budget batching: pack requests up to this many estimated tokens
+        # instead of a fixed number of texts (None keeps fixed-count batches)
+        self.token_budget = getattr(self.global_config, "embedding_token_budget", None) if self.global_config else None
+        self.max_batch_items = getattr(self.global_config, "embedding_max_batch_items", None) or 2048
+
     def encode(self, texts: List[str]):
         # OpenAI/OpenRouter specific: replace newlines
         texts = [t.replace("\n", " ") for t in texts]
@@ -87,15 +112,84 @@ class OpenRouterEmbeddingModel(BaseEmbeddingModel):
         if self.global_config and self.global_config.embedding_batch_size:
             batch_size = self.global_config.embedding_batch_size
             
-        all_embeddings = []
-        
-        # Simple batching
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i+batch_size]
-            batch_embeddings = self.encode(batch)
-            all_embeddings.append(batch_embeddings)
+        if self.cache is not None:
+            return self._batch_encode_cached(texts, batch_size)
+
+        plan = self._plan_batches(texts, batch_size)
+        batches = [[texts[i] for i in indices] for indices in plan]
 
-        if not all_embeddings:
+        # Batches may be length-sorted, so scatter each one back to its original rows
+        embeddings = None
+        for indices, (_, batch_embeddings) in zip(plan, self._encode_batches(batches)):
+            batch_embeddings = np.asarray(batch_embeddings)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=batch_embeddings.dtype)
+            embeddings[indices] = batch_embeddings
+
+        if embeddings is None:
             return np.array([])
             
-        return np.concatenate(all_embeddings)
\ No newline at end of file
+        return embeddings
+
+    def _batch_encode_cached(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Only send cache misses upstream; hits are filled in place from the on-disk cache."""
+        cached = self.cache.get_many(texts)
+        miss_idx = [i for i, v in enumerate(cached) if v is None]
+
+        # Deduplicate misses so repeated strings in one call are embedded once
+        unique_misses = list(dict.fromkeys(texts[i] for i in miss_idx))
+        fresh = {}
+        batches = [[unique_misses[i] for i in indices] for indices in self._plan_batches(unique_misses, batch_size)]
+        for batch, batch_embeddings in self._encode_batches(batches):
+            batch_embeddings = np.asarray(batch_embeddings, dtype=np.float32)
+            self.cache.put_many(batch, batch_embeddings)
+            fresh.update(zip(batch, batch_embeddings))
+        if unique_misses:
+            self.cache.flush()
+
+        if not texts:
+            return np.array([])
+
+        for i in miss_idx:
+            cached[i] = fresh[texts[i]]
+        return np.stack(cached)
+
+    def _plan_batches(self, texts: List[str], batch_size: int) -> List[List[int]]:
+        """
+        Split `texts` into request batches, returned as lists of indices into `texts`.
+
+        Without a token budget this is plain fixed-count slicing. With one, texts are
+        sorted by length and greedily packed until the next text would exceed the
+        budget (or `max_batch_items`), so thousands of short entity/fact strings
+        share a request while long passages get one of their own.
+        """
+        if not self.token_budget:
+            return [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i in sorted(range(len(texts)), key=lambda i: len(texts[i])):
+            tokens = estimate_tokens(texts[i])
+            if current and (current_tokens + tokens > self.token_budget or len(current) >= self.max_batch_items):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _encode_batches(self, batches: List[List[str]]) -> Iterator[tuple]:
+        """
+        Yield `(batch, embeddings)` in input order, keeping up to `self.concurrency`
+        requests in flight. Each batch still goes through `encode`'s retry/backoff.
+        """
+        if self.concurrency <= 1 or len(batches) <= 1:
+            for batch in batches:
+                yield batch, self.encode(batch)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+            # Executor.map submits everything up front but the pool size bounds in-flight requests
+            yield from zip(batches, executor.map(self.encode, batches))
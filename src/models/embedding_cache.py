@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text the same way `OpenRouterEmbeddingModel.encode` does before sending it."""
+    text = unicodedata.normalize("NFC", text).replace("\n", " ")
+    return text if text != "" else " "
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache.
+
+    Vectors are stored in a memory-mapped float32 matrix (`vectors.f32`) and an
+    offset index (`index.json`) maps `sha256(model name + normalized text)` to a
+    row of that matrix. The index is kept in LRU order; once `max_entries` is
+    reached the least recently used row is evicted and its slot reused.
+
+    `flush` appends the entries written since the previous flush to a log
+    (`index.<generation>.log`, one `[key, row]` per line) instead of rewriting
+    the whole index, so flushing after every batch stays proportional to the
+    batch. Once the log outgrows the index it is folded into `index.json`
+    under the next generation, which makes the old log stale. Recency
+    from lookups is not logged, so after a reload the LRU order is insertion
+    order.
+    """
+
+    INDEX_FILE = "index.json"
+    VECTORS_FILE = "vectors.f32"
+    MIN_COMPACT_ENTRIES = 4096 # Never compact a log shorter than this
+
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int = 1_000_000):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.cache_dir = os.path.join(cache_dir, model_name.replace("/", "_"))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        self.vectors_path = os.path.join(self.cache_dir, self.VECTORS_FILE)
+
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self.rows: "OrderedDict[str, int]" = OrderedDict()
+        self.free_rows: List[int] = []
+        self.vectors: Optional[np.memmap] = None
+        self.generation = 0
+        self._pending: List[Tuple[str, int]] = [] # Written since the last flush
+        self._logged = 0 # Entries in the log since the last compaction
+        self._needs_compaction = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load()
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.cache_dir, f"index.{self.generation}.log")
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_name}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up `texts`; returns one vector (copied out of the mmap) or None per text."""
+        results: List[Optional[np.ndarray]] = []
+        for text in texts:
+            key = self.key(text)
+            row = self.rows.get(key)
+            if row is None:
+                self.misses += 1
+                results.append(None)
+                continue
+            self.rows.move_to_end(key)
+            self.hits += 1
+            results.append(np.array(self.vectors[row]))
+        return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dim {vectors.shape[1]} does not match cache dim {self.dim}")
+
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            row = self.rows.get(key)
+            if row is None:
+                row = self._allocate_row()
+            self.rows[key] = row
+            self.rows.move_to_end(key)
+            self.vectors[row] = vector
+            self._pending.append((key, row))
+
+    def flush(self) -> None:
+        """Persist the vectors, then log the new entries (or rewrite the index once the log is long)."""
+        if self.vectors is not None:
+            self.vectors.flush()
+        if not self._pending and not self._needs_compaction:
+            return
+        if (self._needs_compaction or not os.path.exists(self.index_path)
+                or self._logged + len(self._pending) > max(self.MIN_COMPACT_ENTRIES, len(self.rows))):
+            self.compact()
+            return
+        with open(self.log_path, "a") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in self._pending)
+        self._logged += len(self._pending)
+        self._pending = []
+
+    def compact(self) -> None:
+        """Rewrite the whole offset index (atomically replaced) and start a new log generation."""
+        stale_log = self.log_path
+        self.generation += 1
+        index = {
+            "model_name": self.model_name,
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "entries": list(self.rows.items()),
+            "free_rows": self.free_rows,
+            "generation": self.generation,
+        }
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+        if os.path.exists(stale_log):
+            os.remove(stale_log)
+        self._pending = []
+        self._logged = 0
+        self._needs_compaction = False
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.rows),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _load(self) -> None:
+        if not (os.path.exists(self.index_path) and os.path.exists(self.vectors_path)):
+            return
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Warning: Corrupt embedding cache index at {self.index_path}, starting empty.")
+            return
+
+        self.dim = index["dim"]
+        self.capacity = index["capacity"]
+        self.rows = OrderedDict((key, row) for key, row in index["entries"])
+        self.free_rows = index.get("free_rows", [])
+        self.generation = index.get("generation", 0)
+        self._replay_log()
+        if self.dim is not None and self.capacity > 0:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+
+        # The cap may have been lowered since the cache was written
+        while len(self.rows) > self.max_entries:
+            self._evict()
+            self._needs_compaction = True
+
+    def _replay_log(self) -> None:
+        """Apply entries logged after the index was last rewritten."""
+        if not os.path.exists(self.log_path):
+            return
+        row_keys = {row: key for key, row in self.rows.items()}
+        free_rows = set(self.free_rows)
+        with open(self.log_path, "r") as f:
+            for line in f:
+                try:
+                    key, row = json.loads(line)
+                except (json.JSONDecodeError, ValueError):
+                    # Torn line of an interrupted flush; start a clean log before appending to it again
+                    self._needs_compaction = True
+                    break
+                previous = row_keys.get(row)
+                if previous is not None and previous != key:
+                    del self.rows[previous] # The row was evicted and reused
+                self.rows[key] = row
+                self.rows.move_to_end(key)
+                row_keys[row] = key
+                free_rows.discard(row)
+                self._logged += 1
+        self.free_rows = [row for row in self.free_rows if row in free_rows]
+        if self.dim and os.path.exists(self.vectors_path):
+            # The matrix may have grown after the index was written
+            row_bytes = self.dim * np.dtype(np.float32).itemsize
+            self.capacity = max(self.capacity, os.path.getsize(self.vectors_path) // row_bytes)
+
+    def _allocate_row(self) -> int:
+        if self.free_rows:
+            return self.free_rows.pop()
+        used = len(self.rows)
+        if used >= self.max_entries:
+            self._evict()
+            return self.free_rows.pop()
+        if used >= self.capacity:
+            self._grow(min(self.max_entries, max(1024, self.capacity * 2)))
+        # Rows [0, used) are all taken when the free list is empty
+        return used
+
+    def _evict(self) -> None:
+        _, row = self.rows.popitem(last=False)
+        self.free_rows.append(row)
+        self.evictions += 1
+
+    def _grow(self, new_capacity: int) -> None:
+        if self.vectors is not None:
+            self.vectors.flush()
+            del self.vectors
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * np.dtype(np.float32).itemsize)
+        self.capacity = new_capacity
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
@@ -1,8 +1,67 @@
+import asyncio
 import os
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, OpenAI
+
+from .llm_cache import LLMResponseCache, make_cache_key
+
+
+@dataclass
+class GenerationResult:
+    """Outcome of one prompt in `OpenRouterLLM.generate_many`; exactly one of `text`/`error` is set."""
+    prompt: str
+    text: Optional[str] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) from an API error, if present."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
 
 class OpenRouterLLM:
-    def __init__(self, model_name: str = "meta-llama/llama-3.3-70b-instruct"):
+    def __init__(
+        self,
+        model_name: str = "meta-llama/llama-3.3-70b-instruct",
+        base_url: str = "https://openrouter.ai/api/v1",
+        cache_path: Optional[str] = None,
+        cache_ttl_seconds: Optional[float] = None,
+        cache_max_entries: Optional[int] = None,
+        max_connections: int = 64,
+        max_retries: int = 5,
+    ):
         self.model_name = model_name
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
@@ -22,27 +81,166 @@ class OpenRouterLLM:
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable not set and could not be read from src/models/openrouter.txt")
         
+        # One keep-alive connection pool per client, shared by every call (and thread) on this instance.
+        # Retries are handled here rather than by the openai client so Retry-After can be honoured.
+        self.base_url = base_url
+        self.max_retries = max(1, max_retries)
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._timeout = httpx.Timeout(5 * 60, connect=10)
         self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
+            base_url=base_url,
             api_key=self.api_key,
+            max_retries=0,
+            http_client=httpx.Client(limits=self._limits, timeout=self._timeout),
         )
+        # Async clients are created per event loop on first use, see `_async_client`
+        self._async_clients: Dict[asyncio.AbstractEventLoop, AsyncOpenAI] = {}
+        self._async_lock = threading.Lock()
+
+        # Optional prompt/response cache shared by every process pointing at the same file
+        cache_path = cache_path or os.getenv("OPENROUTER_LLM_CACHE")
+        self.cache: Optional[LLMResponseCache] = None
+        if cache_path:
+            self.cache = LLMResponseCache(cache_path, ttl_seconds=cache_ttl_seconds, max_entries=cache_max_entries)
 
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: str, bypass_cache: bool = False, **sampling_params) -> str:
         """
         Generate text from a prompt.
         Args:
             prompt: The input prompt string.
+            bypass_cache: Skip the response cache for this call (the fresh response is still stored).
+            **sampling_params: Extra chat completion arguments (temperature, max_tokens, seed, ...).
         Returns:
             The generated response string.
         """
+        messages = self._messages(prompt)
+        cache_key = self._cache_key(messages, sampling_params)
+        if cache_key is not None and not bypass_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        for attempt in range(self.max_retries):
+            try:
+                completion = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    **sampling_params
+                )
+                break
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries - 1:
+                    print(f"Error generating response: {e}")
+                    raise e
+                time.sleep(self._backoff(e, attempt))
+
+        return self._store(cache_key, completion.choices[0].message.content)
+
+    async def agenerate(self, prompt: str, bypass_cache: bool = False, **sampling_params) -> str:
+        """Async counterpart of `generate`, sharing the same cache and retry policy."""
+        messages = self._messages(prompt)
+        cache_key = self._cache_key(messages, sampling_params)
+        if cache_key is not None and not bypass_cache:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        for attempt in range(self.max_retries):
+            try:
+                completion = await self._async_client().chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    **sampling_params
+                )
+                break
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries - 1:
+                    print(f"Error generating response: {e}")
+                    raise e
+                await asyncio.sleep(self._backoff(e, attempt))
+
+        return await asyncio.to_thread(self._store, cache_key, completion.choices[0].message.content)
+
+    def generate_many(self, prompts: List[str], max_concurrency: int = 8, bypass_cache: bool = False,
+                      **sampling_params) -> List[GenerationResult]:
+        """
+        Generate responses for `prompts` with up to `max_concurrency` requests in flight.
+
+        Results come back in input order. A prompt that still fails after retries
+        gets a `GenerationResult` with `error` set instead of aborting the batch.
+        """
+        def _one(prompt: str) -> GenerationResult:
+            try:
+                return GenerationResult(prompt=prompt, text=self.generate(prompt, bypass_cache=bypass_cache, **sampling_params))
+            except Exception as e:
+                return GenerationResult(prompt=prompt, error=e)
+
+        if not prompts:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(prompts)))) as executor:
+            return list(executor.map(_one, prompts))
+
+    def close(self) -> None:
+        """Release the pooled HTTP connections. Inside a running event loop, `await aclose()` instead."""
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return completion.choices[0].message.content
-        except Exception as e:
-            print(f"Error generating response: {e}")
-            raise e
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.client.close()
+            with self._async_lock:
+                clients, self._async_clients = self._async_clients, {}
+            for loop, client in clients.items():
+                # Connections of a closed loop cannot be closed through it any more; they go with the client
+                if not loop.is_closed() and not loop.is_running():
+                    loop.run_until_complete(client.close())
+            return
+        raise RuntimeError("close() cannot wait for the async client inside a running event loop; use `await aclose()`")
+
+    async def aclose(self) -> None:
+        """Async counterpart of `close`, for the client of the running loop."""
+        self.client.close()
+        with self._async_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def _async_client(self) -> AsyncOpenAI:
+        """
+        The async client of the running event loop. httpx binds pooled connections
+        to the loop that opened them, so each loop (e.g. every `asyncio.run`) gets
+        its own client; those of loops that have closed since are dropped.
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            for closed in [l for l in self._async_clients if l.is_closed()]:
+                del self._async_clients[closed]
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = AsyncOpenAI(
+                    base_url=self.base_url,
+                    api_key=self.api_key,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(limits=self._limits, timeout=self._timeout),
+                )
+        return client
+
+    @staticmethod
+    def _messages(prompt: str) -> List[dict]:
+        return [
+            {"role": "user", "content": prompt}
+        ]
+
+    def _cache_key(self, messages: List[dict], sampling_params: dict) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return make_cache_key(self.model_name, messages, sampling_params)
+
+    def _store(self, cache_key: Optional[str], response: str) -> str:
+        if cache_key is not None and response is not None:
+            self.cache.put(cache_key, response)
+        return response
+
+    @staticmethod
+    def _backoff(error: Exception, attempt: int) -> float:
+        # Prefer the provider's Retry-After (sent with 429s), otherwise exponential backoff from 1s
+        retry_after = _retry_after_seconds(error)
+        return retry_after if retry_after is not None else float(2 ** attempt)
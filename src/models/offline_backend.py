@@ -0,0 +1,352 @@
+"""
+Offline, OpenAI-compatible stand-in for OpenRouter.
+
+Serves `/v1/chat/completions` and `/v1/embeddings` from a local HTTP server so
+HippoRAG (which builds its own OpenAI clients from `llm_base_url` /
+`embedding_base_url`) can run with no network and no API cost:
+
+- chat returns deterministic synthetic answers shaped like HippoRAG's NER,
+  triple extraction, fact filtering and QA prompts expect;
+- embeddings are deterministic bag-of-words vectors built from hash-seeded
+  token vectors, so texts sharing words are still similar;
+- an injected latency (fixed + seeded jitter) can emulate a remote provider;
+- `record` mode proxies to a real upstream and stores every response,
+  `replay` mode serves the recorded responses back.
+
+Run standalone with `python src/models/offline_backend.py --port 8000` or
+in-process via `OfflineOpenAIServer(...).start()`.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MODES = ("synthetic", "record", "replay")
+
+_ENTITY_PATTERN = re.compile(r"\b[A-Z][\w'-]*(?:[ \t]+(?:of|the|de|von|[A-Z][\w'-]*))*")
+_NON_ENTITIES = {"A", "An", "The", "In", "On", "It", "He", "She", "They", "This", "That", "Is", "Are", "Was", "Were",
+                 "Who", "What", "Where", "When", "Which", "Why", "How", "Did", "Do", "Does", "Question", "Answer"}
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _seed(*parts: str) -> int:
+    digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+@lru_cache(maxsize=200_000)
+def _token_vector(token: str, dim: int) -> np.ndarray:
+    return np.random.default_rng(_seed("token", token)).standard_normal(dim).astype(np.float32)
+
+
+def synthetic_embedding(text: str, dim: int) -> np.ndarray:
+    """Unit-norm sum of hash-seeded token vectors; identical texts give identical vectors."""
+    tokens = _TOKEN_PATTERN.findall(text.lower()) or [text]
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokens:
+        vector += _token_vector(token, dim)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def _extract_entities(text: str, limit: int = 12) -> List[str]:
+    entities = []
+    for match in _ENTITY_PATTERN.findall(text):
+        entity = match.strip(" .,'")
+        if entity.split(" ", 1)[0] in _NON_ENTITIES:
+            entity = entity.split(" ", 1)[1] if " " in entity else ""
+        if len(entity) > 1 and entity not in entities:
+            entities.append(entity)
+        if len(entities) >= limit:
+            break
+    return entities
+
+
+def _json_after(text: str, marker: str) -> Optional[Any]:
+    """Decode the first JSON value that follows `marker` in `text`."""
+    start = text.find(marker)
+    if start < 0:
+        return None
+    start = text.find("{", start)
+    if start < 0:
+        return None
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text[start:])
+        return value
+    except json.JSONDecodeError:
+        return None
+
+
+def synthetic_chat_response(messages: List[Dict[str, Any]]) -> str:
+    """Deterministic answer for the HippoRAG prompt family `messages` belongs to."""
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if "[[ ## fact_before_filter ## ]]" in user:
+        # Recognition memory filter: keep the first (highest scored) candidate facts
+        facts = (_json_after(user, "[[ ## fact_before_filter ## ]]") or {}).get("fact", [])
+        return f"[[ ## fact_after_filter ## ]]\n{json.dumps({'fact': facts[:4]})}\n\n[[ ## completed ## ]]"
+
+    if "RDF" in system:
+        # Triple extraction: chain the named entities HippoRAG passes along with the passage
+        named_entities = (_json_after(user, '{"named_entities"') or {}).get("named_entities") or _extract_entities(user)
+        triples = [[a, "related to", b] for a, b in zip(named_entities, named_entities[1:])]
+        return json.dumps({"triples": triples})
+
+    if "named entities" in system.lower():
+        return json.dumps({"named_entities": _extract_entities(user)})
+
+    # QA / anything else: answer with the first entity mentioned in the question
+    entities = _extract_entities(user.split("Question:")[-1], limit=1)
+    answer = entities[0] if entities else "unknown"
+    return f"Thought: synthetic offline answer.\nAnswer: {answer}"
+
+
+class OfflineOpenAIServer:
+    """Threaded local server speaking the subset of the OpenAI API HippoRAG uses."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        embedding_dim: int = 1536,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        mode: str = "synthetic",
+        record_path: Optional[str] = None,
+        upstream_base_url: str = "https://openrouter.ai/api/v1",
+        upstream_api_key: Optional[str] = None,
+        strict_replay: bool = True,
+        seed: int = 0,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {MODES}")
+        if mode != "synthetic" and not record_path:
+            raise ValueError(f"Mode '{mode}' needs a record_path")
+
+        self.embedding_dim = embedding_dim
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.mode = mode
+        self.record_path = record_path
+        self.upstream_base_url = upstream_base_url.rstrip("/")
+        self.upstream_api_key = upstream_api_key or os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
+        self.strict_replay = strict_replay
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recorded: Dict[str, Any] = {}
+        if mode == "replay":
+            self._recorded = self._load_recording(record_path)
+
+        self.request_counts = {"chat": 0, "embeddings": 0, "replay_misses": 0}
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "OfflineOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="offline-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "OfflineOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --- request handling ---
+
+    def handle(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        endpoint = path.rstrip("/").rsplit("/", 1)[-1]
+        if endpoint not in ("completions", "embeddings"):
+            return 404, {"error": {"message": f"Unsupported endpoint {path}", "type": "invalid_request_error"}}
+
+        self._sleep()
+        with self._lock:
+            self.request_counts["chat" if endpoint == "completions" else "embeddings"] += 1
+
+        if self.mode == "synthetic":
+            return 200, self._synthetic(endpoint, body)
+
+        key = self._request_key(endpoint, body)
+        if self.mode == "replay":
+            if key in self._recorded:
+                return 200, self._recorded[key]
+            with self._lock:
+                self.request_counts["replay_misses"] += 1
+            if self.strict_replay:
+                return 404, {"error": {"message": "Request not found in recording", "type": "replay_miss"}}
+            return 200, self._synthetic(endpoint, body)
+
+        status, response = self._forward(path, body)
+        if status == 200:
+            self._record(key, response)
+        return status, response
+
+    def _synthetic(self, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        model = body.get("model", "offline")
+        if endpoint == "completions":
+            messages = body.get("messages", [])
+            content = synthetic_chat_response(messages)
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+            completion_tokens = len(content) // 4
+            return {
+                "id": f"chatcmpl-offline-{_seed(json.dumps(messages, sort_keys=True)):x}",
+                "object": "chat.completion",
+                "created": 0,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dim = int(body.get("dimensions") or self.embedding_dim)
+        data = []
+        for i, text in enumerate(inputs):
+            vector = synthetic_embedding(str(text), dim)
+            if body.get("encoding_format") == "base64":
+                embedding: Any = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(str(t)) for t in inputs) // 4
+        return {"object": "list", "data": data, "model": model,
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def _sleep(self) -> None:
+        if self.latency_ms <= 0 and self.latency_jitter_ms <= 0:
+            return
+        with self._lock:
+            jitter = self._rng.uniform(0, self.latency_jitter_ms)
+        time.sleep((self.latency_ms + jitter) / 1000)
+
+    # --- record / replay ---
+
+    @staticmethod
+    def _request_key(endpoint: str, body: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps([endpoint, body], sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _load_recording(path: str) -> Dict[str, Any]:
+        recorded = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        recorded[entry["key"]] = entry["response"]
+        print(f"Loaded {len(recorded)} recorded responses from {path}")
+        return recorded
+
+    def _record(self, key: str, response: Dict[str, Any]) -> None:
+        with self._lock:
+            with open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "response": response}) + "\n")
+
+    def _forward(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        import httpx
+
+        suffix = path.split("/v1", 1)[-1]
+        try:
+            response = httpx.post(
+                self.upstream_base_url + suffix,
+                json=body,
+                headers={"Authorization": f"Bearer {self.upstream_api_key}"},
+                timeout=300,
+            )
+            return response.status_code, response.json()
+        except Exception as e:
+            return 502, {"error": {"message": f"Upstream request failed: {e}", "type": "upstream_error"}}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    status, payload = server.handle(self.path, body)
+                except Exception as e:
+                    status, payload = 500, {"error": {"message": str(e), "type": "server_error"}}
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # keep experiment output readable
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible backend for HippoRAG scaling runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--mode", choices=MODES, default="synthetic")
+    parser.add_argument("--record-path", default=None)
+    parser.add_argument("--upstream-base-url", default="https://openrouter.ai/api/v1")
+    args = parser.parse_args()
+
+    server = OfflineOpenAIServer(
+        host=args.host,
+        port=args.port,
+        embedding_dim=args.embedding_dim,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        mode=args.mode,
+        record_path=args.record_path,
+        upstream_base_url=args.upstream_base_url,
+    )
+    print(f"Serving offline OpenAI-compatible API ({args.mode}) at {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,10 @@ import sys
 import numpy as np
 
 # Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from embedding import OpenRouterEmbeddingModel
-from llm import OpenRouterLLM
+from models.embedding import OpenRouterEmbeddingModel
+from models.llm import OpenRouterLLM
 
 def verify_embedding():
     print("--- Verifying Embedding Model ---")
@@ -0,0 +1,280 @@
+import time
+from typing import Any, Dict, List, Set
+
+import numpy as np
+from hipporag.utils.misc_utils import (compute_mdhash_id, extract_entity_nodes, flatten_facts,
+                                       reformat_openie_results, text_processing)
+
+from . import synonymy_ann
+from .synonymy_ann import store_embeddings
+
+
+class GrowableRows:
+    """Row-major float32 matrix with amortized O(1) appends; `view` is what retrieval reads."""
+
+    def __init__(self, initial: np.ndarray):
+        initial = np.asarray(initial, dtype=np.float32)
+        self._size = len(initial)
+        self._buffer = initial.reshape(self._size, -1) if self._size else None
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._buffer[:self._size] if self._buffer is not None else np.empty((0, 0), dtype=np.float32)
+
+    def append(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.float32)
+        if len(rows) == 0:
+            return self.view
+        needed = self._size + len(rows)
+        if self._buffer is None:
+            self._buffer = np.empty((max(needed, 1024), rows.shape[1]), dtype=np.float32)
+        elif needed > len(self._buffer):
+            grown = np.empty((max(needed, 2 * len(self._buffer)), rows.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size:needed] = rows
+        self._size = needed
+        return self.view
+
+
+class IncrementalGraph:
+    """
+    Replacement for `HippoRAG.index` that applies each call as a delta.
+
+    Vanilla `index()` reloads and rewrites the OpenIE file, re-processes the
+    triples of every chunk, rewrites all three embedding-store parquet files,
+    scans every graph vertex name and pickles the whole graph on each call, so
+    one-document calls cost O(corpus). Here only the new chunks are processed:
+    their vertices and edges are appended to the graph, `node_name_to_vertex_idx`,
+    `ent_node_to_chunk_ids` and the retrieval arrays (keys, vertex indices,
+    embedding matrices, `proc_triples_to_docs`) are extended in place, and
+    everything that has to be written to disk is deferred to `flush()`.
+
+    `flush()` runs every `flush_every` calls (0 = never automatically) and
+    before `prepare_retrieval_objects`, which reads the OpenIE file.
+    Synonymy edges come from the `synonymy_ann` patch, which only searches
+    neighbours of the new entities; vanilla `add_synonymy_edges` runs KNN over
+    every entity and re-adds the old pairs as duplicate edges on every call.
+    """
+
+    def __init__(self, rag: Any, flush_every: int = 0):
+        if rag.global_config.openie_mode == 'offline':
+            raise ValueError("IncrementalGraph only supports online OpenIE")
+        if getattr(rag, "synonymy_ann", None) is None:
+            raise ValueError("IncrementalGraph needs the synonymy_ann patch installed first")
+        self.rag = rag
+        self.flush_every = flush_every
+        self.calls = 0
+        self.calls_since_flush = 0
+        self.flushes = 0
+        self.flush_time_s = 0.0
+        self.call_times: List[float] = []
+        self._openie_dirty = False
+        self._dirty_stores: Set[Any] = set()
+        self._embedding_rows: Dict[str, GrowableRows] = {}
+
+        self.openie_info, _ = rag.load_existing_openie([])
+        self.openie_by_key = {info['idx']: info for info in self.openie_info}
+        graph = rag.graph
+        self.vertex_idx: Dict[str, int] = {name: i for i, name in enumerate(graph.vs["name"])} if graph.vcount() else {}
+
+        # Rebuilt once from OpenIE for the chunks already in the graph, then only extended
+        self.ent_node_to_chunk_ids: Dict[str, Set[str]] = {}
+        known = [info for info in self.openie_info if info['idx'] in self.vertex_idx]
+        _, triple_results = reformat_openie_results(known)
+        for chunk_key, triples in triple_results.items():
+            self._link_entities(chunk_key, [text_processing(t) for t in triples.triples])
+        rag.ent_node_to_chunk_ids = self.ent_node_to_chunk_ids
+
+        for store in (rag.chunk_embedding_store, rag.entity_embedding_store, rag.fact_embedding_store):
+            self._defer_saves(store)
+
+    def index(self, docs: List[str]) -> None:
+        call_start = time.perf_counter()
+        rag = self.rag
+        chunk_store, entity_store, fact_store = rag.chunk_embedding_store, rag.entity_embedding_store, rag.fact_embedding_store
+        sizes_before = [len(store.hash_ids) for store in (chunk_store, entity_store, fact_store)]
+
+        chunk_store.insert_strings(docs)
+        chunk_ids = list(dict.fromkeys(
+            key for key in (compute_mdhash_id(doc, prefix="chunk-") for doc in docs) if key not in self.vertex_idx
+        ))
+        if chunk_ids:
+            to_extract = {key: chunk_store.get_row(key) for key in chunk_ids if key not in self.openie_by_key}
+            if to_extract:
+                ner_results, triple_results = rag.openie.batch_openie(to_extract)
+                start = len(self.openie_info)
+                rag.merge_openie_results(self.openie_info, to_extract, ner_results, triple_results)
+                for info in self.openie_info[start:]:
+                    self.openie_by_key[info['idx']] = info
+                self._openie_dirty = True
+
+            _, triple_results = reformat_openie_results([self.openie_by_key[key] for key in chunk_ids])
+            chunk_triples = [[text_processing(t) for t in triple_results[key].triples] for key in chunk_ids]
+            entity_nodes, chunk_triple_entities = extract_entity_nodes(chunk_triples)
+            facts = flatten_facts(chunk_triples)
+            entity_store.insert_strings(entity_nodes)
+            fact_store.insert_strings([str(fact) for fact in facts])
+
+            new_entities = [key for key in dict.fromkeys(compute_mdhash_id(e, prefix="entity-") for e in entity_nodes)
+                            if key not in self.vertex_idx]
+            self._add_vertices(new_entities + chunk_ids)
+            self._add_edges(chunk_ids, chunk_triples, chunk_triple_entities)
+
+        if rag.ready_to_retrieve:
+            self._extend_retrieval_objects(chunk_ids, sizes_before)
+
+        self.calls += 1
+        self.calls_since_flush += 1
+        if self.flush_every and self.calls_since_flush >= self.flush_every:
+            self.flush()
+        self.call_times.append(time.perf_counter() - call_start)
+
+    def _link_entities(self, chunk_key: str, triples: List[List[str]]) -> Dict[tuple, float]:
+        """Fact edge counts of one chunk, recording the chunk for every entity it mentions."""
+        stats: Dict[tuple, float] = {}
+        for triple in triples:
+            node_key = compute_mdhash_id(content=triple[0], prefix="entity-")
+            node_2_key = compute_mdhash_id(content=triple[2], prefix="entity-")
+            stats[(node_key, node_2_key)] = stats.get((node_key, node_2_key), 0.0) + 1
+            stats[(node_2_key, node_key)] = stats.get((node_2_key, node_key), 0.0) + 1
+            for node in (node_key, node_2_key):
+                self.ent_node_to_chunk_ids.setdefault(node, set()).add(chunk_key)
+        return stats
+
+    def _add_vertices(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        rag = self.rag
+        rows = [(rag.entity_embedding_store if key.startswith("entity-") else rag.chunk_embedding_store).get_row(key)
+                for key in keys]
+        start = rag.graph.vcount()
+        rag.graph.add_vertices(n=len(keys), attributes={
+            "hash_id": [row["hash_id"] for row in rows],
+            "content": [row["content"] for row in rows],
+            "name": keys,
+        })
+        for offset, key in enumerate(keys):
+            self.vertex_idx[key] = start + offset
+
+    def _add_edges(self, chunk_ids: List[str], chunk_triples: List[List[List[str]]],
+                   chunk_triple_entities: List[List[str]]) -> None:
+        rag = self.rag
+        stats: Dict[tuple, float] = {}
+        for chunk_key, triples in zip(chunk_ids, chunk_triples):
+            for edge, count in self._link_entities(chunk_key, triples).items():
+                stats[edge] = stats.get(edge, 0.0) + count
+        for chunk_key, entities in zip(chunk_ids, chunk_triple_entities):
+            for entity in entities:
+                stats[(chunk_key, compute_mdhash_id(entity, prefix="entity-"))] = 1.0
+
+        rag.node_to_node_stats = stats
+        rag.add_synonymy_edges() # Only pairs with a new entity, see SynonymyANN
+
+        edges, weights = [], []
+        for (source, target), weight in rag.node_to_node_stats.items():
+            if source == target:
+                continue
+            source_idx, target_idx = self.vertex_idx.get(source), self.vertex_idx.get(target)
+            if source_idx is None or target_idx is None:
+                continue
+            edges.append((source_idx, target_idx))
+            weights.append(weight)
+        rag.graph.add_edges(edges, attributes={"weight": weights})
+
+    def _extend_retrieval_objects(self, chunk_ids: List[str], sizes_before: List[int]) -> None:
+        rag = self.rag
+        for attribute, store, size_before in (("passage", rag.chunk_embedding_store, sizes_before[0]),
+                                              ("entity", rag.entity_embedding_store, sizes_before[1]),
+                                              ("fact", rag.fact_embedding_store, sizes_before[2])):
+            new_keys = store.hash_ids[size_before:]
+            if not new_keys:
+                continue
+            getattr(rag, f"{attribute}_node_keys").extend(new_keys)
+            if attribute != "fact":
+                getattr(rag, f"{attribute}_node_idxs").extend(self.vertex_idx[key] for key in new_keys)
+            current = getattr(rag, f"{attribute}_embeddings")
+            if hasattr(current, "grow_to"):
+                current.grow_to(len(store.hash_ids)) # A view of a memory-mapped store, which already holds the rows
+                continue
+            rows = self._embedding_rows.get(attribute)
+            if rows is None:
+                rows = self._embedding_rows[attribute] = GrowableRows(current)
+            setattr(rag, f"{attribute}_embeddings", rows.append(store_embeddings(store, new_keys)))
+
+        rag.node_name_to_vertex_idx = self.vertex_idx
+        for chunk_key in chunk_ids:
+            for triple in flatten_facts([self.openie_by_key[chunk_key]['extracted_triples']]):
+                if len(triple) == 3:
+                    proc_triple = str(tuple(text_processing(list(triple))))
+                    rag.proc_triples_to_docs.setdefault(proc_triple, set()).add(chunk_key)
+
+    def _defer_saves(self, store: Any) -> None:
+        """Make a vanilla `EmbeddingStore` update its lookups per new row and persist only on flush."""
+        if not hasattr(store, "_save_data"):
+            return # Some other store class whose persistence this patch does not know how to defer
+        for name in ("hash_id_to_text", "text_to_hash_id"):
+            if not hasattr(store, name):
+                setattr(store, name, {})
+
+        def upsert(hash_ids, texts, embeddings):
+            start = len(store.hash_ids)
+            store.embeddings.extend(embeddings)
+            store.hash_ids.extend(hash_ids)
+            store.texts.extend(texts)
+            for idx, (hash_id, text) in enumerate(zip(hash_ids, texts), start):
+                store.hash_id_to_idx[hash_id] = idx
+                store.hash_id_to_row[hash_id] = {"hash_id": hash_id, "content": text}
+                store.hash_id_to_text[hash_id] = text
+                store.text_to_hash_id[text] = hash_id
+            self._dirty_stores.add(store)
+
+        store._upsert = upsert
+
+    def flush(self) -> None:
+        """Write the OpenIE results, dirty embedding stores and the graph."""
+        flush_start = time.perf_counter()
+        if self._openie_dirty:
+            self.rag.save_openie_results(self.openie_info)
+            self._openie_dirty = False
+        for store in self._dirty_stores:
+            store._save_data()
+        self._dirty_stores.clear()
+        if self.calls_since_flush:
+            self.rag.save_igraph()
+        self.calls_since_flush = 0
+        self.flushes += 1
+        self.flush_time_s += time.perf_counter() - flush_start
+
+    def stats(self) -> Dict[str, Any]:
+        call_times = np.asarray(self.call_times) if self.call_times else np.zeros(1)
+        return {
+            "index_calls": self.calls,
+            "avg_call_ms": float(call_times.mean() * 1000.0),
+            "max_call_ms": float(call_times.max() * 1000.0),
+            "flushes": self.flushes,
+            "flush_time_s": self.flush_time_s,
+            "vertices": self.rag.graph.vcount(),
+            "edges": self.rag.graph.ecount(),
+        }
+
+
+def install(rag: Any, **kwargs) -> IncrementalGraph:
+    """
+    Route `rag.index` through an `IncrementalGraph`; returns it for `flush()` and stats.
+    Installs the `synonymy_ann` patch with its defaults unless `rag` already has it.
+    """
+    if getattr(rag, "synonymy_ann", None) is None:
+        synonymy_ann.install(rag)
+    patch = IncrementalGraph(rag, **kwargs)
+    prepare_retrieval_objects = rag.prepare_retrieval_objects
+
+    def prepare_after_flush():
+        patch.flush()
+        prepare_retrieval_objects()
+        patch._embedding_rows.clear() # The embedding matrices were just rebuilt
+
+    rag.index = patch.index
+    rag.prepare_retrieval_objects = prepare_after_flush
+    rag.incremental_graph = patch
+    return patch
@@ -0,0 +1,330 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from hipporag.utils.misc_utils import compute_mdhash_id
+
+logger = logging.getLogger(__name__)
+
+STORE_ATTRIBUTES = ("chunk_embedding_store", "entity_embedding_store", "fact_embedding_store")
+CODE_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+
+class QuantizedMatrix:
+    """
+    The first `rows` rows of a `QuantizedEmbeddingStore`, usable where HippoRAG expects
+    its dense embedding matrices.
+
+    `np.dot(matrix, queries)` is dispatched through `__array_function__` to a
+    block-wise dequantizing product against the memory map, so
+    `get_fact_scores`, `dense_passage_retrieval` and `batched_retrieve` work
+    unchanged. Any other NumPy use materializes a float32 copy via `__array__`.
+    """
+
+    ndim = 2
+
+    def __init__(self, store: "QuantizedEmbeddingStore", rows: int):
+        self.store = store
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def shape(self):
+        return (self.rows, self.store.dim or 0)
+
+    def grow_to(self, rows: int) -> None:
+        self.rows = rows
+
+    def dot(self, other) -> np.ndarray:
+        other = np.asarray(other, dtype=np.float32)
+        if other.ndim == 1:
+            return self.store.score(other[None, :], self.rows)[:, 0]
+        return self.store.score(other.T, self.rows)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func is np.dot and len(args) == 2 and args[0] is self and not kwargs:
+            return self.dot(args[1])
+        return NotImplemented
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.store.dequantize(np.arange(self.rows))
+        return dense if dtype is None else dense.astype(dtype)
+
+
+class QuantizedEmbeddingStore:
+    """
+    Drop-in replacement for HippoRAG's `EmbeddingStore` that keeps vectors on disk.
+
+    Rows are appended as float16, or as int8 with one float32 scale per row
+    (max |x| / 127), to `vdb_<namespace>.<dtype>.bin` and read back through a
+    read-only memory map; hash ids and texts go to a JSONL file next to it.
+    Only the texts and the hash-to-row lookups stay in RAM. Appends write just
+    the new rows, unlike the parquet store, which rewrites itself on every
+    insert. A crash between the files is recovered on load by keeping the rows
+    present in all of them.
+    """
+
+    def __init__(self, embedding_model, db_filename, batch_size, namespace, dtype: str = "int8",
+                 block_rows: int = 65536):
+        if dtype not in CODE_DTYPES:
+            raise ValueError(f"Unknown dtype '{dtype}', expected one of {list(CODE_DTYPES)}")
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.namespace = namespace
+        self.dtype = dtype
+        self.code_dtype = np.dtype(CODE_DTYPES[dtype])
+        self.block_rows = block_rows
+
+        if not os.path.exists(db_filename):
+            logger.info(f"Creating working directory: {db_filename}")
+            os.makedirs(db_filename, exist_ok=True)
+        base = os.path.join(db_filename, f"vdb_{self.namespace}.{dtype}")
+        self.filename = base + ".bin"
+        self.scales_filename = base + ".scales.bin"
+        self.meta_filename = base + ".jsonl"
+
+        self.dim: Optional[int] = None
+        self._codes: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._mapped_rows = 0
+        self._defer_dense = False
+        self._load_data()
+
+    def _load_data(self):
+        self.hash_ids, self.texts = [], []
+        if os.path.exists(self.meta_filename):
+            with open(self.meta_filename, "r") as f:
+                lines = [json.loads(line) for line in f if line.endswith("\n")]
+            if lines:
+                self.dim = lines[0]["dim"]
+                for entry in lines[1:]:
+                    self.hash_ids.append(entry["hash_id"])
+                    self.texts.append(entry["content"])
+
+        if self.dim is not None:
+            rows = min(len(self.hash_ids), os.path.getsize(self.filename) // (self.dim * self.code_dtype.itemsize)
+                       if os.path.exists(self.filename) else 0)
+            if self.dtype == "int8":
+                rows = min(rows, os.path.getsize(self.scales_filename) // 4 if os.path.exists(self.scales_filename) else 0)
+            if rows < len(self.hash_ids) or self._file_rows() > rows:
+                logger.warning(f"Truncating {self.meta_filename} to {rows} complete rows")
+                self._truncate(rows)
+
+        self.hash_id_to_idx = {h: idx for idx, h in enumerate(self.hash_ids)}
+        self.hash_id_to_row = {h: {"hash_id": h, "content": t} for h, t in zip(self.hash_ids, self.texts)}
+        self.hash_id_to_text = dict(zip(self.hash_ids, self.texts))
+        self.text_to_hash_id = {t: h for h, t in zip(self.hash_ids, self.texts)}
+        logger.info(f"Loaded {len(self.hash_ids)} records from {self.filename}")
+
+    def _file_rows(self) -> int:
+        if self.dim is None or not os.path.exists(self.filename):
+            return 0
+        return os.path.getsize(self.filename) // (self.dim * self.code_dtype.itemsize)
+
+    def _truncate(self, rows: int) -> None:
+        del self.hash_ids[rows:], self.texts[rows:]
+        for path, row_bytes in ((self.filename, self.dim * self.code_dtype.itemsize), (self.scales_filename, 4)):
+            if os.path.exists(path):
+                with open(path, "r+b") as f:
+                    f.truncate(rows * row_bytes)
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        tmp_path = self.meta_filename + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"dim": self.dim, "dtype": self.dtype}) + "\n")
+            for h, t in zip(self.hash_ids, self.texts):
+                f.write(json.dumps({"hash_id": h, "content": t}) + "\n")
+        os.replace(tmp_path, self.meta_filename)
+
+    def get_missing_string_hash_ids(self, texts: List[str]):
+        nodes_dict = {compute_mdhash_id(text, prefix=self.namespace + "-"): text for text in texts}
+        missing_ids = [hash_id for hash_id in nodes_dict if hash_id not in self.hash_id_to_row]
+        return {h: {"hash_id": h, "content": nodes_dict[h]} for h in missing_ids}
+
+    def insert_strings(self, texts: List[str]):
+        missing = self.get_missing_string_hash_ids(texts)
+        logger.info(f"Inserting {len(missing)} new records.")
+        if not missing:
+            return {}
+        texts_to_encode = [row["content"] for row in missing.values()]
+        missing_embeddings = self.embedding_model.batch_encode(texts_to_encode)
+        self._upsert(list(missing), texts_to_encode, missing_embeddings)
+
+    def quantize(self, vectors: np.ndarray):
+        """(codes, per-row scales or None) for float32 `vectors`."""
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _upsert(self, hash_ids, texts, embeddings):
+        if len(hash_ids) == 0:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(hash_ids), -1)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._write_meta()
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension changed from {self.dim} to {vectors.shape[1]}")
+        self._append_rows(hash_ids, texts, *self.quantize(vectors))
+
+        start = len(self.hash_ids)
+        self.hash_ids.extend(hash_ids)
+        self.texts.extend(texts)
+        for idx, (h, t) in enumerate(zip(hash_ids, texts), start):
+            self.hash_id_to_idx[h] = idx
+            self.hash_id_to_row[h] = {"hash_id": h, "content": t}
+            self.hash_id_to_text[h] = t
+            self.text_to_hash_id[t] = h
+
+    def _append_rows(self, hash_ids, texts, codes: np.ndarray, scales: Optional[np.ndarray]) -> None:
+        # Vectors first: a row only counts once its metadata line is complete
+        with open(self.filename, "ab") as f:
+            f.write(codes.tobytes())
+        if scales is not None:
+            with open(self.scales_filename, "ab") as f:
+                f.write(scales.tobytes())
+        with open(self.meta_filename, "a") as f:
+            for h, t in zip(hash_ids, texts):
+                f.write(json.dumps({"hash_id": h, "content": t}) + "\n")
+
+    def delete(self, hash_ids):
+        """Rewrites all files without `hash_ids`; deletion is rare, appends are the hot path."""
+        drop = {self.hash_id_to_idx[h] for h in hash_ids}
+        keep = np.array([i for i in range(len(self.hash_ids)) if i not in drop], dtype=np.int64)
+        vectors = self.dequantize(keep) if len(keep) else np.empty((0, self.dim or 0), dtype=np.float32)
+        kept_ids = [self.hash_ids[i] for i in keep]
+        kept_texts = [self.texts[i] for i in keep]
+        self._codes = self._scales = None
+        self._mapped_rows = 0
+        for path in (self.filename, self.scales_filename):
+            if os.path.exists(path):
+                os.remove(path)
+        self.hash_ids, self.texts = [], []
+        self._write_meta()
+        if kept_ids:
+            self._append_rows(kept_ids, kept_texts, *self.quantize(vectors))
+        self.hash_ids, self.texts = kept_ids, kept_texts
+        self.hash_id_to_idx = {h: idx for idx, h in enumerate(self.hash_ids)}
+        self.hash_id_to_row = {h: {"hash_id": h, "content": t} for h, t in zip(self.hash_ids, self.texts)}
+        self.hash_id_to_text = dict(zip(self.hash_ids, self.texts))
+        self.text_to_hash_id = {t: h for h, t in zip(self.hash_ids, self.texts)}
+
+    def _mapped(self):
+        """(codes, scales) memory maps covering every row, remapped after appends."""
+        rows = len(self.hash_ids)
+        if rows != self._mapped_rows:
+            self._codes = np.memmap(self.filename, dtype=self.code_dtype, mode="r", shape=(rows, self.dim))
+            if self.dtype == "int8":
+                self._scales = np.memmap(self.scales_filename, dtype=np.float32, mode="r", shape=(rows,))
+            self._mapped_rows = rows
+        return self._codes, self._scales
+
+    def dequantize(self, indices: np.ndarray) -> np.ndarray:
+        codes, scales = self._mapped()
+        vectors = codes[indices].astype(np.float32)
+        if scales is not None:
+            vectors *= scales[indices][:, None]
+        return vectors
+
+    def score(self, queries: np.ndarray, rows: Optional[int] = None) -> np.ndarray:
+        """(#rows, #queries) dot products against the first `rows` rows, dequantized block by block."""
+        rows = len(self.hash_ids) if rows is None else rows
+        queries = np.asarray(queries, dtype=np.float32)
+        scores = np.empty((rows, len(queries)), dtype=np.float32)
+        if rows == 0:
+            return scores
+        codes, row_scales = self._mapped()
+        for start in range(0, rows, self.block_rows):
+            end = min(start + self.block_rows, rows)
+            block = codes[start:end].astype(np.float32) @ queries.T
+            if row_scales is not None:
+                block *= row_scales[start:end][:, None]
+            scores[start:end] = block
+        return scores
+
+    def matrix(self, rows: Optional[int] = None) -> QuantizedMatrix:
+        return QuantizedMatrix(self, len(self.hash_ids) if rows is None else rows)
+
+    def footprint(self) -> Dict[str, Any]:
+        file_bytes = len(self.hash_ids) * (self.dim or 0) * self.code_dtype.itemsize
+        if self.dtype == "int8":
+            file_bytes += 4 * len(self.hash_ids)
+        return {"rows": len(self.hash_ids), "dim": self.dim or 0, "embedding_mb": 0.0,
+                "mapped_mb": file_bytes / 1024**2, "dtype": self.dtype}
+
+    def get_row(self, hash_id):
+        return self.hash_id_to_row[hash_id]
+
+    def get_hash_id(self, text):
+        return self.text_to_hash_id[text]
+
+    def get_rows(self, hash_ids, dtype=np.float32):
+        if not hash_ids:
+            return {}
+        return {id: self.hash_id_to_row[id] for id in hash_ids}
+
+    def get_all_ids(self):
+        return list(self.hash_ids)
+
+    def get_all_id_to_rows(self):
+        return {h: dict(row) for h, row in self.hash_id_to_row.items()}
+
+    def get_all_texts(self):
+        return set(self.texts)
+
+    def get_embedding(self, hash_id, dtype=np.float32) -> np.ndarray:
+        return self.get_embeddings([hash_id], dtype)[0]
+
+    def get_embeddings(self, hash_ids, dtype=np.float32) -> np.ndarray:
+        if not hash_ids:
+            return []
+        if self._defer_dense:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        indices = np.array([self.hash_id_to_idx[h] for h in hash_ids], dtype=np.intp)
+        return self.dequantize(indices).astype(dtype, copy=False)
+
+
+def install(rag: Any, dtype: str = "int8") -> Dict[str, QuantizedEmbeddingStore]:
+    """
+    Replace the three embedding stores of `rag` with `QuantizedEmbeddingStore`s in the
+    same directories. Rows already in a parquet store are imported once. After
+    `prepare_retrieval_objects`, the entity, passage and fact matrices are
+    `QuantizedMatrix` views instead of dense float32 copies.
+    """
+    stores = {}
+    for attribute in STORE_ATTRIBUTES:
+        old = getattr(rag, attribute)
+        store = QuantizedEmbeddingStore(old.embedding_model, os.path.dirname(old.filename), old.batch_size,
+                                        old.namespace, dtype)
+        old_ids = list(getattr(old, "hash_ids", []))
+        if not store.hash_ids and old_ids:
+            print(f"Importing {len(old_ids)} {old.namespace} embeddings into the {dtype} store...")
+            store._upsert(old_ids, list(old.texts), np.asarray(old.embeddings, dtype=np.float32))
+        setattr(rag, attribute, store)
+        stores[attribute] = store
+
+    prepare_retrieval_objects = rag.prepare_retrieval_objects
+
+    def prepare_with_views():
+        # The original would copy every store into a dense array; the views replace those copies
+        for store in stores.values():
+            store._defer_dense = True
+        try:
+            prepare_retrieval_objects()
+        finally:
+            for store in stores.values():
+                store._defer_dense = False
+        rag.entity_embeddings = rag.entity_embedding_store.matrix(len(rag.entity_node_keys))
+        rag.passage_embeddings = rag.chunk_embedding_store.matrix(len(rag.passage_node_keys))
+        rag.fact_embeddings = rag.fact_embedding_store.matrix(len(rag.fact_node_keys))
+
+    rag.prepare_retrieval_objects = prepare_with_views
+    return stores
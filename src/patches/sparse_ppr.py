@@ -0,0 +1,256 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class SparsePPR:
+    """
+    Personalized PageRank by power iteration over a SciPy CSR matrix.
+
+    Matches `igraph.Graph.personalized_pagerank(directed=False, weights='weight')`
+    as HippoRAG calls it: parallel edges add up, each node spreads its rank in
+    proportion to edge weight, and the rank of nodes without edges is
+    redistributed like the teleport, along the reset vector.
+
+    Several reset vectors are solved together as one sparse-times-dense-block
+    product per iteration; a column stops iterating once its L1 change drops
+    below `tol`. Columns start from the global (uniform reset) PageRank, which
+    is cached per graph version and is already close to most personalized
+    solutions on a connected graph.
+
+    The edge list is mirrored from the graph: edges appended since the last
+    sync are copied over and the CSR matrix is rebuilt only when it is next
+    needed, so indexing does not pay for it.
+    """
+
+    def __init__(self, graph: Any, damping: float = 0.5, tol: float = 1e-8, max_iter: int = 100,
+                 warm_start: bool = True, keep_resets: int = 32):
+        self.graph = graph
+        self.damping = damping
+        self.tol = tol
+        self.max_iter = max_iter
+        self.warm_start = warm_start
+        self.recent_resets = deque(maxlen=keep_resets)
+
+        self._transition: Optional[sp.csr_matrix] = None
+        self._dangling: Optional[np.ndarray] = None
+        self._global: Optional[np.ndarray] = None
+        self.iterations: List[int] = []
+        self.rebuilds = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the mirrored edges; the next sync copies the whole graph."""
+        self._sources = np.empty(0, dtype=np.int64)
+        self._targets = np.empty(0, dtype=np.int64)
+        self._weights = np.empty(0, dtype=np.float64)
+        self._synced_edges = 0
+        self._synced_vertices = 0
+        self._transition = self._dangling = self._global = None
+
+    def sync(self) -> None:
+        """Mirror edges added to the graph since the last call."""
+        graph = self.graph
+        edge_count, vertex_count = graph.ecount(), graph.vcount()
+        if edge_count == self._synced_edges and vertex_count == self._synced_vertices:
+            return
+        if edge_count < self._synced_edges:
+            self.reset() # Edges were deleted, which renumbers them
+        if edge_count > self._synced_edges:
+            if self._synced_edges == 0:
+                pairs = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+                weights = np.asarray(graph.es["weight"], dtype=np.float64)
+            else:
+                new_edges = graph.es.select(range(self._synced_edges, edge_count))
+                pairs = np.array([edge.tuple for edge in new_edges], dtype=np.int64).reshape(-1, 2)
+                weights = np.asarray(new_edges["weight"], dtype=np.float64)
+            self._sources = np.concatenate([self._sources, pairs[:, 0]])
+            self._targets = np.concatenate([self._targets, pairs[:, 1]])
+            self._weights = np.concatenate([self._weights, weights])
+        self._synced_edges, self._synced_vertices = edge_count, vertex_count
+        self._transition = self._dangling = self._global = None
+
+    def _build(self) -> None:
+        n = self._synced_vertices
+        # Undirected: every edge carries rank both ways; duplicates are summed by the COO -> CSR conversion
+        rows = np.concatenate([self._targets, self._sources])
+        cols = np.concatenate([self._sources, self._targets])
+        weights = np.concatenate([self._weights, self._weights])
+        adjacency = sp.coo_matrix((weights, (rows, cols)), shape=(n, n)).tocsr()
+        strength = np.asarray(adjacency.sum(axis=0)).ravel()
+        self._dangling = strength == 0
+        inverse = np.divide(1.0, strength, out=np.zeros_like(strength), where=strength > 0)
+        # Column-stochastic transition: T[i, j] = w_ij / strength_j
+        self._transition = (adjacency @ sp.diags(inverse)).tocsr()
+        self.rebuilds += 1
+
+    def global_pagerank(self) -> np.ndarray:
+        self.sync()
+        if self._global is None:
+            n = self._synced_vertices
+            self._global = self._iterate(np.full((n, 1), 1.0 / n), np.full((n, 1), 1.0 / n))[:, 0]
+        return self._global
+
+    def run(self, reset: np.ndarray, record: bool = True) -> np.ndarray:
+        """
+        PageRank for one reset vector (n,) or a block of them (n, b), each column summing to 1.
+
+        Unless `record` is False the reset vectors are kept in `recent_resets` as samples of real queries.
+        """
+        self.sync()
+        single = reset.ndim == 1
+        reset = np.asarray(reset, dtype=np.float64).reshape(len(reset), -1)
+        reset = np.where(np.isnan(reset) | (reset < 0), 0, reset)
+        totals = reset.sum(axis=0, keepdims=True)
+        reset = np.divide(reset, totals, out=np.full_like(reset, 1.0 / len(reset)), where=totals > 0)
+        if record:
+            self.recent_resets.extend(reset.T)
+
+        if self.warm_start:
+            start = np.repeat(self.global_pagerank()[:, None], reset.shape[1], axis=1)
+        else:
+            start = reset.copy()
+        scores = self._iterate(reset, start)
+        return scores[:, 0] if single else scores
+
+    def _iterate(self, reset: np.ndarray, start: np.ndarray) -> np.ndarray:
+        if self._transition is None:
+            self._build()
+        d = self.damping
+        scores = start.copy()
+        active = np.arange(reset.shape[1])
+        for iteration in range(1, self.max_iter + 1):
+            current = scores[:, active]
+            dangling_mass = current[self._dangling].sum(axis=0)
+            updated = d * (self._transition @ current) + (d * dangling_mass + (1.0 - d)) * reset[:, active]
+            scores[:, active] = updated
+            converged = np.abs(updated - current).sum(axis=0) < self.tol
+            if converged.any():
+                self.iterations.extend([iteration] * int(converged.sum()))
+                active = active[~converged]
+                if len(active) == 0:
+                    break
+        else:
+            self.iterations.extend([self.max_iter] * len(active))
+        return scores / scores.sum(axis=0, keepdims=True)
+
+    @contextmanager
+    def deferred(self, rag: Any):
+        """
+        Within the block `rag.run_ppr` only records its reset vector and returns a
+        placeholder ranking; `solve_deferred` then solves them all as one batch.
+        """
+        pending: List[np.ndarray] = []
+        run_ppr = rag.run_ppr
+
+        def record(reset_prob, damping=0.5):
+            pending.append(np.asarray(reset_prob, dtype=np.float64))
+            count = len(rag.passage_node_idxs)
+            return np.arange(count), np.zeros(count)
+
+        rag.run_ppr = record
+        try:
+            yield pending
+        finally:
+            rag.run_ppr = run_ppr
+
+    def solve_deferred(self, rag: Any, pending: Sequence[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        if not pending:
+            return []
+        self.damping = rag.global_config.damping or 0.5
+        scores = self.run(np.stack(pending, axis=1))[rag.passage_node_idxs]
+        results = []
+        for column in scores.T:
+            sorted_doc_ids = np.argsort(column)[::-1]
+            results.append((sorted_doc_ids, column[sorted_doc_ids]))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "vertices": self._synced_vertices,
+            "edges": self._synced_edges,
+            "csr_rebuilds": self.rebuilds,
+            "solves": len(self.iterations),
+            "avg_iterations": float(np.mean(self.iterations)) if self.iterations else 0.0,
+        }
+
+
+def synthetic_resets(rag: Any, count: int, seeds_per_query: int = 5, seed: int = 0) -> np.ndarray:
+    """Reset vectors shaped like HippoRAG's: a few weighted entity nodes plus small passage weights."""
+    rng = np.random.default_rng(seed)
+    n = rag.graph.vcount()
+    resets = np.zeros((n, count))
+    entity_idxs = np.asarray(rag.entity_node_idxs)
+    passage_idxs = np.asarray(rag.passage_node_idxs)
+    for column in range(count):
+        chosen = rng.choice(entity_idxs, size=min(seeds_per_query, len(entity_idxs)), replace=False)
+        resets[chosen, column] = rng.random(len(chosen))
+        resets[passage_idxs, column] = rng.random(len(passage_idxs)) * rag.global_config.passage_node_weight
+    return resets
+
+
+def benchmark_against_igraph(rag: Any, engine: SparsePPR, resets: np.ndarray, k: int = 5) -> Dict[str, Any]:
+    """
+    Per-query latency of igraph's PPR (as `HippoRAG.run_ppr` calls it) against the sparse engine,
+    one query at a time and as one batch, plus top-`k` passage agreement and L1 distance.
+    """
+    damping = rag.global_config.damping or 0.5
+    passage_idxs = np.asarray(rag.passage_node_idxs)
+    count = resets.shape[1]
+
+    start = time.perf_counter()
+    reference = np.column_stack([
+        np.asarray(rag.graph.personalized_pagerank(vertices=range(rag.graph.vcount()), damping=damping, directed=False,
+                                                   weights='weight', reset=resets[:, i], implementation='prpack'))
+        for i in range(count)
+    ])
+    igraph_ms = 1000.0 * (time.perf_counter() - start) / count
+
+    engine.damping = damping
+    engine.sync()
+    engine.global_pagerank() # Build and warm-start cost is paid once per graph change, not per query
+    start = time.perf_counter()
+    for i in range(count):
+        engine.run(resets[:, i], record=False)
+    single_ms = 1000.0 * (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    batched = engine.run(resets, record=False)
+    batched_ms = 1000.0 * (time.perf_counter() - start) / count
+
+    k = min(k, len(passage_idxs))
+    agreement = []
+    for i in range(count):
+        expected = np.argsort(reference[passage_idxs, i])[::-1][:k]
+        found = np.argsort(batched[passage_idxs, i])[::-1][:k]
+        agreement.append(len(set(expected.tolist()) & set(found.tolist())) / k if k else 1.0)
+    return {
+        "queries": count,
+        "igraph_ms_per_query": igraph_ms,
+        "sparse_ms_per_query": single_ms,
+        "sparse_batched_ms_per_query": batched_ms,
+        "k": k,
+        "topk_agreement": float(np.mean(agreement)) if agreement else 1.0,
+        "max_l1_distance": float(np.abs(reference - batched).sum(axis=0).max()) if count else 0.0,
+    }
+
+
+def install(rag: Any, **kwargs) -> SparsePPR:
+    """Route `rag.run_ppr` through a `SparsePPR` over `rag.graph`; returns it for batching and stats."""
+    engine = SparsePPR(rag.graph, **kwargs)
+
+    def run_ppr(reset_prob: np.ndarray, damping: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+        if engine.graph is not rag.graph:
+            engine.graph = rag.graph
+            engine.reset()
+        engine.damping = 0.5 if damping is None else damping
+        doc_scores = engine.run(reset_prob)[rag.passage_node_idxs]
+        sorted_doc_ids = np.argsort(doc_scores)[::-1]
+        return sorted_doc_ids, doc_scores[sorted_doc_ids]
+
+    rag.run_ppr = run_ppr
+    rag.sparse_ppr = engine
+    return engine
@@ -0,0 +1,256 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def store_embeddings(store: Any, hash_ids: Sequence[str]) -> np.ndarray:
+    """
+    Embeddings of `hash_ids` from an embedding store. The vanilla store's
+    `get_embeddings` converts its whole embedding list to an array on every
+    call, so its rows are gathered directly.
+    """
+    if hasattr(store, "hash_id_to_idx") and isinstance(getattr(store, "embeddings", None), list):
+        return np.asarray([store.embeddings[store.hash_id_to_idx[h]] for h in hash_ids], dtype=np.float32)
+    return np.asarray(store.get_embeddings(list(hash_ids)), dtype=np.float32)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Centroids (unit length) of `vectors` (unit rows) under cosine similarity."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~np.any(sums, axis=1)
+        # Re-seed empty clusters with random points so every list stays usable
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Incremental inverted-file index for cosine similarity over unit vectors.
+
+    Below `train_min` vectors every search is exact. Once trained, vectors are
+    assigned to the nearest of `nlist` k-means centroids and a search only scans
+    the `nprobe` lists closest to the query. When the index has grown by
+    `retrain_growth` since the last training, centroids are recomputed and all
+    rows reassigned, which keeps lists balanced at amortized O(1) cost per add.
+    """
+
+    def __init__(self, nprobe: int = 8, train_min: int = 2048, retrain_growth: float = 4.0,
+                 nlist: Optional[int] = None, train_sample: int = 50_000, seed: int = 0):
+        self.nprobe = nprobe
+        self.train_min = train_min
+        self.retrain_growth = retrain_growth
+        self.fixed_nlist = nlist
+        self.train_sample = train_sample
+        self.seed = seed
+
+        self.ids: List[str] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self._trained_at = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size] if self._vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        if len(ids) == 0:
+            return
+        vectors = _normalize_rows(vectors)
+        start = self._size
+        self._reserve(start + len(ids), vectors.shape[1])
+        self._vectors[start:start + len(ids)] = vectors
+        self._size += len(ids)
+        self.ids.extend(ids)
+
+        if self.centroids is None:
+            if self._size >= self.train_min:
+                self._train()
+        elif self._size >= self._trained_at * self.retrain_growth:
+            self._train()
+        else:
+            self._assign(np.arange(start, self._size))
+
+    def search(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Per query: (row indices, scores) of up to `k` neighbours, best first."""
+        queries = _normalize_rows(queries)
+        vectors = self.vectors
+        if self.centroids is None:
+            return [self._top_k(np.arange(self._size), vectors @ q, k) for q in queries]
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        results = []
+        for q, lists in zip(queries, probes):
+            candidates = np.concatenate([self._list_array(int(l)) for l in lists])
+            results.append(self._top_k(candidates, vectors[candidates] @ q, k))
+        return results
+
+    def _top_k(self, candidates: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores)
+        return candidates[order], scores[order]
+
+    def _train(self) -> None:
+        vectors = self.vectors
+        nlist = self.fixed_nlist or max(1, int(4 * np.sqrt(self._size)))
+        nlist = min(nlist, self._size)
+        rng = np.random.default_rng(self.seed)
+        sample = vectors if self._size <= self.train_sample else vectors[rng.choice(self._size, self.train_sample, replace=False)]
+        self.centroids = spherical_kmeans(sample, nlist, seed=self.seed)
+        self._lists = [[] for _ in range(nlist)]
+        self._list_arrays = {}
+        self._trained_at = self._size
+        self._assign(np.arange(self._size))
+
+    def _assign(self, rows: np.ndarray) -> None:
+        for start in range(0, len(rows), 65536):
+            block = rows[start:start + 65536]
+            for row, list_id in zip(block.tolist(), np.argmax(self.vectors[block] @ self.centroids.T, axis=1).tolist()):
+                self._lists[list_id].append(row)
+                self._list_arrays.pop(list_id, None)
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays.get(list_id)
+        if array is None:
+            array = self._list_arrays[list_id] = np.asarray(self._lists[list_id], dtype=np.int64)
+        return array
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        if self._vectors is None:
+            self._vectors = np.empty((max(rows, 1024), dim), dtype=np.float32)
+        elif rows > len(self._vectors):
+            capacity = len(self._vectors)
+            while capacity < rows:
+                capacity *= 2
+            grown = np.empty((capacity, dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+
+class SynonymyANN:
+    """
+    Replacement for `HippoRAG.add_synonymy_edges` backed by an incremental IVF index.
+
+    Vanilla HippoRAG runs an exact KNN for every entity against every entity on
+    each `index()` call and re-adds all resulting edges, so old synonymy pairs
+    become duplicate graph edges. Here the entity store's new rows are added to
+    the index and only they are queried; each pair above the threshold is
+    recorded in both directions, so existing entities gain edges to new
+    synonyms. Filtering (alphanumeric length, threshold, 100-neighbour cap)
+    follows the original.
+    """
+
+    def __init__(self, rag: Any, max_neighbors: int = 128, **index_kwargs):
+        self.rag = rag
+        self.max_neighbors = max_neighbors
+        self.index = IVFIndex(**index_kwargs)
+        self.queried_entities = 0
+        # Entities already in the store have their synonymy edges in the loaded graph
+        self._sync_store(query=False)
+
+    def add_synonymy_edges(self) -> None:
+        self._sync_store(query=True)
+
+    def _sync_store(self, query: bool) -> None:
+        rag = self.rag
+        store = rag.entity_embedding_store
+        # The store only appends during indexing, so new entities are the rows past what we have seen
+        if len(store.hash_ids) < len(self.index):
+            raise RuntimeError("Entity store shrank; SynonymyANN only supports append-only stores")
+        new_ids = list(store.hash_ids[len(self.index):])
+        # Read-only view instead of get_all_id_to_rows(), which deep-copies the whole store on every call
+        rag.entity_id_to_row = store.hash_id_to_row
+        if not new_ids:
+            return
+
+        start = len(self.index)
+        self.index.add(new_ids, store_embeddings(store, new_ids))
+        if not query:
+            return
+
+        config = rag.global_config
+        k = min(config.synonymy_edge_topk, self.max_neighbors)
+        threshold = config.synonymy_edge_sim_threshold
+        rows = store.hash_id_to_row
+        for offset, (neighbors, scores) in enumerate(self.index.search(self.index.vectors[start:], k)):
+            node_key = new_ids[offset]
+            if len(re.sub('[^A-Za-z0-9]', '', rows[node_key]["content"])) <= 2:
+                continue
+            num_nns = 0
+            for row, score in zip(neighbors.tolist(), scores.tolist()):
+                if score < threshold or num_nns > 100:
+                    break
+                nn = self.index.ids[row]
+                if nn != node_key and rows[nn]["content"] != '':
+                    rag.node_to_node_stats[(node_key, nn)] = score
+                    if row < start and len(re.sub('[^A-Za-z0-9]', '', rows[nn]["content"])) > 2:
+                        rag.node_to_node_stats[(nn, node_key)] = score
+                    num_nns += 1
+        self.queried_entities += len(new_ids)
+
+    def recall(self, sample_size: int = 500, k: Optional[int] = None, seed: int = 0) -> Dict[str, Any]:
+        """
+        Fraction of exact above-threshold neighbours (top `k`) that the index also returns,
+        measured on a random sample of indexed entities.
+        """
+        config = self.rag.global_config
+        k = k or min(config.synonymy_edge_topk, self.max_neighbors)
+        threshold = config.synonymy_edge_sim_threshold
+        vectors = self.index.vectors
+        if len(vectors) == 0:
+            return {"sample": 0, "exact_pairs": 0, "recall": 1.0}
+
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False)
+        approx = self.index.search(vectors[sample], k)
+        exact_pairs = found_pairs = 0
+        for row, (ann_rows, _) in zip(sample, approx):
+            scores = vectors @ vectors[row]
+            exact_rows, exact_scores = self.index._top_k(np.arange(len(vectors)), scores, k)
+            expected = {int(r) for r, s in zip(exact_rows, exact_scores) if s >= threshold and r != row}
+            exact_pairs += len(expected)
+            found_pairs += len(expected & set(ann_rows.tolist()))
+        return {
+            "sample": len(sample),
+            "exact_pairs": exact_pairs,
+            "recall": found_pairs / exact_pairs if exact_pairs else 1.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entities": len(self.index),
+            "queried_entities": self.queried_entities,
+            "trained": self.index.centroids is not None,
+            "nlist": len(self.index.centroids) if self.index.centroids is not None else 0,
+            "nprobe": self.index.nprobe,
+        }
+
+
+def install(rag: Any, **kwargs) -> SynonymyANN:
+    """Route `rag.add_synonymy_edges` through a `SynonymyANN`; returns it for stats and recall checks."""
+    patch = SynonymyANN(rag, **kwargs)
+    rag.add_synonymy_edges = patch.add_synonymy_edges
+    rag.synonymy_ann = patch
+    return patch
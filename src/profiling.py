@@ -0,0 +1,162 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# HippoRAG methods worth attributing time to, mapped to the phase name they report under.
+# Times are inclusive: "index" contains "openie", "embed_chunks", ... and those contain
+# the "embedding_requests"/"llm_requests" made by the model wrappers.
+HIPPORAG_PHASES = {
+    "index": "index",
+    "load_existing_openie": "openie_load",
+    "save_openie_results": "openie_persist",
+    "add_fact_edges": "graph_fact_edges",
+    "add_passage_edges": "graph_passage_edges",
+    "add_synonymy_edges": "synonymy_edges",
+    "add_new_nodes": "graph_add_nodes",
+    "add_new_edges": "graph_add_edges",
+    "save_igraph": "graph_persist",
+    "prepare_retrieval_objects": "retrieval_prepare",
+    "retrieve": "retrieve",
+    "get_query_embeddings": "query_embedding",
+    "rerank_facts": "fact_rerank",
+    "run_ppr": "ppr",
+    "qa": "qa",
+}
+
+EMBEDDING_STORES = {
+    "chunk_embedding_store": "chunks",
+    "entity_embedding_store": "entities",
+    "fact_embedding_store": "facts",
+}
+
+
+def _text_bytes(texts) -> int:
+    if isinstance(texts, str):
+        texts = [texts]
+    return sum(len(t.encode("utf-8")) for t in texts)
+
+
+def _messages_bytes(*args, **kwargs) -> int:
+    messages = kwargs.get("messages", args[0] if args else [])
+    return len(json.dumps(messages, default=str).encode("utf-8"))
+
+
+class PhaseProfiler:
+    """
+    Wraps methods of HippoRAG and our model wrappers to attribute cost to phases.
+
+    Every wrapped call adds wall time, process CPU time, a call count and (for the
+    model wrappers) request payload bytes to its phase. CPU time is process-wide,
+    so calls that overlap on worker threads (e.g. OpenIE requests) each see the
+    CPU burned by all of them. `write_step` appends one JSONL record with
+    everything collected since the previous step and resets the counters, so
+    each line describes exactly one experiment step.
+    """
+
+    def __init__(self, output_path: Optional[str] = None):
+        self.output_path = output_path
+        self._lock = threading.Lock()
+        self._phases: Dict[str, Dict[str, float]] = {}
+
+    def wrap(self, obj: Any, method_name: str, phase: Optional[str] = None,
+             bytes_fn: Optional[Callable[..., int]] = None) -> None:
+        """Replace `obj.method_name` with a timed version; missing methods are skipped."""
+        method = getattr(obj, method_name, None)
+        if method is None or getattr(method, "_profiled", False):
+            return
+        phase = phase or method_name
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                sent = bytes_fn(*args, **kwargs) if bytes_fn is not None else 0
+                self._add(phase, time.perf_counter() - wall_start, time.process_time() - cpu_start, sent)
+
+        timed._profiled = True
+        setattr(obj, method_name, timed)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time an arbitrary block under `name`."""
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - wall_start, time.process_time() - cpu_start, 0)
+
+    def instrument_hipporag(self, rag: Any) -> None:
+        for method_name, phase in HIPPORAG_PHASES.items():
+            self.wrap(rag, method_name, phase)
+
+        # Batched retrieval with the sparse PPR patch: run_ppr only records reset vectors, the solve happens here
+        if getattr(rag, "sparse_ppr", None) is not None:
+            self.wrap(rag.sparse_ppr, "solve_deferred", "ppr")
+
+        if getattr(rag, "openie", None) is not None:
+            self.wrap(rag.openie, "batch_openie", "openie")
+
+        for attr, label in EMBEDDING_STORES.items():
+            store = getattr(rag, attr, None)
+            if store is None:
+                continue
+            self.wrap(store, "insert_strings", f"embed_{label}")
+            self.wrap(store, "_save_data", f"persist_{label}")
+            self.wrap(store, "_append_rows", f"persist_{label}") # QuantizedEmbeddingStore
+
+        if getattr(rag, "llm_model", None) is not None:
+            self.instrument_llm(rag.llm_model, "infer")
+        # DSPyFilter keeps its own reference to llm_model.infer
+        rerank_filter = getattr(rag, "rerank_filter", None)
+        if rerank_filter is not None and hasattr(rerank_filter, "llm_infer_fn"):
+            self.wrap(rerank_filter, "llm_infer_fn", "llm_requests", bytes_fn=_messages_bytes)
+
+    def instrument_embedding_model(self, model: Any) -> None:
+        # encode is the per-request call; batch_encode includes cache lookups and batching
+        self.wrap(model, "encode", "embedding_requests", bytes_fn=lambda texts, *a, **kw: _text_bytes(texts))
+        self.wrap(model, "batch_encode", "embedding_batch_encode")
+
+    def instrument_llm(self, llm: Any, method_name: str = "generate") -> None:
+        if method_name == "generate":
+            bytes_fn = lambda prompt, *a, **kw: _text_bytes(prompt)
+        else:
+            bytes_fn = _messages_bytes
+        self.wrap(llm, method_name, "llm_requests", bytes_fn=bytes_fn)
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            phases = {name: dict(stats) for name, stats in sorted(self._phases.items())}
+            if reset:
+                self._phases = {}
+        return phases
+
+    def write_step(self, step_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Append `{**step_info, "phases": {...}}` as one JSONL line and reset the counters."""
+        record = {**step_info, "phases": self.snapshot(reset=True)}
+        if self.output_path:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+    @staticmethod
+    def summarize(record: Dict[str, Any], top: int = 5) -> List[str]:
+        """Human-readable lines for the `top` phases by wall time."""
+        phases = sorted(record["phases"].items(), key=lambda kv: kv[1]["wall_s"], reverse=True)
+        return [
+            f"{name}: {stats['wall_s']:.2f}s wall, {stats['cpu_s']:.2f}s cpu, {int(stats['calls'])} calls"
+            + (f", {stats['bytes_sent'] / 1e6:.2f} MB sent" if stats["bytes_sent"] else "")
+            for name, stats in phases[:top]
+        ]
+
+    def _add(self, phase: str, wall: float, cpu: float, sent: int) -> None:
+        with self._lock:
+            stats = self._phases.setdefault(phase, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0, "bytes_sent": 0})
+            stats["wall_s"] += wall
+            stats["cpu_s"] += cpu
+            stats["calls"] += 1
+            stats["bytes_sent"] += sent
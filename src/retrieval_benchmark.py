@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def latency_summary(latencies_s: Sequence[float], errors: int, duration_s: float) -> Dict[str, Any]:
+    """Percentiles in milliseconds plus throughput of the successful requests."""
+    result: Dict[str, Any] = {
+        "requests": len(latencies_s) + errors,
+        "errors": errors,
+        "duration_s": duration_s,
+        "throughput_qps": len(latencies_s) / duration_s if duration_s > 0 else 0.0,
+    }
+    if latencies_s:
+        latencies_ms = np.asarray(latencies_s) * 1000.0
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        result.update({
+            "mean_ms": float(latencies_ms.mean()),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(latencies_ms.max()),
+        })
+    return result
+
+
+class RetrievalLoadGenerator:
+    """
+    Drives a retrieve-only callable with concurrent load and reports latency percentiles.
+
+    Closed loop: `concurrency` workers each send their next query as soon as the
+    previous one returned, which measures capacity. Open loop: queries arrive as
+    a Poisson process at a fixed rate regardless of how fast earlier ones finish;
+    latency is measured from the scheduled arrival, so time spent queued behind
+    slow requests counts (no coordinated omission).
+
+    Warmup queries run sequentially first, so lazy first-call setup (clients,
+    thread pools, caches) is not measured. HippoRAG's `index()` does not mark
+    its retrieval objects stale, so the caller has to reset `ready_to_retrieve`
+    and run `prepare_retrieval_objects` after indexing, or every run scores
+    against the index as it was first prepared. HippoRAG keeps every query
+    embedding it computed (only `prepare_retrieval_objects` clears them), so
+    warmup and measured queries should not overlap.
+    """
+
+    def __init__(self, retrieve_fn: Callable[[str], Any], concurrency: int = 4, max_open_loop_workers: int = 64):
+        self.retrieve_fn = retrieve_fn
+        self.concurrency = concurrency
+        self.max_open_loop_workers = max_open_loop_workers
+
+    def warmup(self, queries: Sequence[str]) -> int:
+        """Run `queries` sequentially and return how many failed."""
+        errors = 0
+        for query in queries:
+            try:
+                self.retrieve_fn(query)
+            except Exception:
+                errors += 1
+        return errors
+
+    def run_closed_loop(self, queries: Sequence[str], concurrency: Optional[int] = None) -> Dict[str, Any]:
+        concurrency = concurrency or self.concurrency
+        latencies: List[float] = []
+        errors = 0
+        lock = threading.Lock()
+        pending = iter(queries)
+
+        def worker():
+            nonlocal errors
+            while True:
+                with lock:
+                    query = next(pending, None)
+                if query is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    self.retrieve_fn(query)
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        latencies.append(elapsed)
+                except Exception:
+                    with lock:
+                        errors += 1
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+        return {"mode": "closed_loop", "concurrency": concurrency, **latency_summary(latencies, errors, duration)}
+
+    def run_open_loop(self, queries: Sequence[str], arrival_rate_qps: float, seed: int = 0) -> Dict[str, Any]:
+        """Send every query once, at exponentially distributed inter-arrival times."""
+        rng = random.Random(seed)
+        latencies: List[float] = []
+        errors = 0
+        lock = threading.Lock()
+
+        def timed(query: str, scheduled: float):
+            nonlocal errors
+            try:
+                self.retrieve_fn(query)
+                elapsed = time.perf_counter() - scheduled
+                with lock:
+                    latencies.append(elapsed)
+            except Exception:
+                with lock:
+                    errors += 1
+
+        start = time.perf_counter()
+        scheduled = start
+        with ThreadPoolExecutor(max_workers=self.max_open_loop_workers) as executor:
+            for query in queries:
+                scheduled += rng.expovariate(arrival_rate_qps)
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(timed, query, scheduled)
+        duration = time.perf_counter() - start
+        return {"mode": "open_loop", "arrival_rate_qps": arrival_rate_qps, **latency_summary(latencies, errors, duration)}
@@ -0,0 +1,201 @@
+"""
+Run experiment.py over a matrix of settings, one process per cell.
+
+A matrix config is a JSON object:
+
+    {
+      "settings": {"OFFLINE_BACKEND": true, "SUBSETS": [10, 20, 40, 80]},
+      "matrix": {"EMBEDDING_BATCH_SIZE": [8, 16], "INDEXING_STRATEGIES": [["per_document"], ["bulk"]]},
+      "workers": 2,
+      "output_dir": "matrix_runs"
+    }
+
+Every combination of the `matrix` values (on top of `settings`) is one cell.
+Each cell runs in its own directory under `output_dir`, so its save dir,
+checkpoint, results, profile and embedding cache are all separate. At most
+`workers` cells run at a time. Once all cells finish, their step results are
+merged into `<output_dir>/matrix_results.json` with a `tag` naming the cell,
+which analyze_results.py groups by.
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add src to python path to allow imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config_overrides import load_overrides, parse_setting
+
+EXPERIMENT_SCRIPT = Path(__file__).resolve().parent / "experiment.py"
+CELL_RESULTS_FILE = "scaling_results.json"
+CELL_CONFIG_FILE = "cell_config.json"
+CELL_LOG_FILE = "run.log"
+MERGED_RESULTS_FILE = "matrix_results.json"
+MANIFEST_FILE = "matrix_manifest.json"
+# BLAS/OpenMP pools would otherwise each size themselves to the whole machine
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def format_value(value: Any) -> str:
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    return value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))
+
+
+def expand_matrix(settings: Dict[str, Any], matrix: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """One cell per combination of matrix values, in config order; `tag` names the varied values."""
+    for name, values in matrix.items():
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"Matrix axis {name} needs a non-empty list of values, got {values!r}")
+    names = list(matrix)
+    cells = []
+    for combination in itertools.product(*(matrix[name] for name in names)):
+        varied = dict(zip(names, combination))
+        tag = ",".join(f"{name}={format_value(value)}" for name, value in varied.items()) or "default"
+        cells.append({"tag": tag, "varied": varied, "settings": {**settings, **varied}})
+    return cells
+
+
+def validate_settings(cells: List[Dict[str, Any]], known: List[str]):
+    """Fail before launching anything when a setting name is not one of experiment.py's."""
+    unknown = sorted({name for cell in cells for name in cell["settings"]} - set(known))
+    if unknown:
+        raise ValueError(f"Unknown setting(s) {unknown}, expected some of {sorted(known)}")
+
+
+def prepare_cell(cell: Dict[str, Any], cell_dir: Path, launch_dir: Path, memory_ceiling_gb: Optional[float]) -> Dict[str, Any]:
+    """Write the cell's config into its directory; inputs shared by all cells are resolved against `launch_dir`."""
+    settings = dict(cell["settings"])
+    settings["RESULTS_FILE"] = CELL_RESULTS_FILE
+    if settings.get("STREAM_SOURCE"):
+        settings["STREAM_SOURCE"] = str(launch_dir / settings["STREAM_SOURCE"])
+    # A replay recording is read by every cell; "record" writes one per cell
+    if settings.get("OFFLINE_MODE") == "replay" and settings.get("OFFLINE_RECORD_PATH"):
+        settings["OFFLINE_RECORD_PATH"] = str(launch_dir / settings["OFFLINE_RECORD_PATH"])
+    if memory_ceiling_gb is not None:
+        settings.setdefault("MEMORY_CEILING_GB", memory_ceiling_gb)
+
+    cell_dir.mkdir(parents=True, exist_ok=True)
+    if not settings.get("RESUME"):
+        # Results of an earlier run of this cell must not be merged if this one dies early
+        for stale in (CELL_RESULTS_FILE, CELL_LOG_FILE):
+            (cell_dir / stale).unlink(missing_ok=True)
+    with open(cell_dir / CELL_CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+    return settings
+
+
+def run_cell(cell: Dict[str, Any], cell_dir: Path, threads: int) -> Dict[str, Any]:
+    env = dict(os.environ)
+    for var in THREAD_ENV_VARS:
+        env.setdefault(var, str(threads))
+    start = time.time()
+    with open(cell_dir / CELL_LOG_FILE, "a", encoding="utf-8") as log:
+        process = subprocess.run(
+            [sys.executable, str(EXPERIMENT_SCRIPT), "--config", CELL_CONFIG_FILE],
+            cwd=cell_dir, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    return {"exit_code": process.returncode, "duration_s": time.time() - start}
+
+
+def merge_results(cells: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """All step records of all cells, each tagged with its cell (and strategy, when a cell ran several)."""
+    merged = []
+    for cell in cells:
+        path = Path(cell["dir"]) / CELL_RESULTS_FILE
+        if not path.exists():
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        several = len({r.get("indexing_strategy") for r in records}) > 1
+        for record in records:
+            tag = f"{cell['tag']}/{record.get('indexing_strategy')}" if several else cell["tag"]
+            merged.append({**record, "tag": tag, "matrix_cell": cell["varied"]})
+    return merged
+
+
+def print_summary(cells: List[Dict[str, Any]], merged: List[Dict[str, Any]]):
+    print("\n--- Matrix summary ---")
+    print("exit".rjust(6) + "steps".rjust(7) + "docs".rjust(8) + "indexing s".rjust(12) + "  tag")
+    for cell in cells:
+        steps = [r for r in merged if r["matrix_cell"] == cell["varied"]]
+        last = steps[-1] if steps else {}
+        exit_code = "-" if cell.get("exit_code") is None else str(cell["exit_code"])
+        print(exit_code.rjust(6) + str(len(steps)).rjust(7) + str(last.get("document_count", "-")).rjust(8)
+              + (f"{last['total_indexing_time_s']:.1f}" if last else "-").rjust(12) + f"  {cell['tag']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run experiment.py over a matrix of settings in parallel processes")
+    parser.add_argument("config", nargs="?", help="Matrix config JSON (see module docstring)")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                        help="Setting for every cell; VALUE is parsed as JSON")
+    parser.add_argument("--axis", action="append", default=[], metavar="NAME=[V1,V2,...]",
+                        help="Add a matrix axis; the values are a JSON list")
+    parser.add_argument("--workers", type=int, help="Cells run at the same time (default 1)")
+    parser.add_argument("--threads-per-cell", type=int,
+                        help="BLAS/OpenMP threads per cell (default: CPU count / workers)")
+    parser.add_argument("--memory-budget-gb", type=float,
+                        help="Total memory for all running cells (default: experiment.py's MEMORY_CEILING_GB); "
+                             "each gets an equal share as its MEMORY_CEILING_GB unless it sets one")
+    parser.add_argument("--output-dir", help="Directory for cell directories and merged results (default matrix_runs)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the cells")
+    args = parser.parse_args(argv)
+
+    config: Dict[str, Any] = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    settings = {**config.get("settings", {}), **load_overrides(assignments=args.settings)}
+    matrix = dict(config.get("matrix", {}))
+    matrix.update(parse_setting(axis) for axis in args.axis)
+    workers = max(1, args.workers or config.get("workers", 1))
+    threads = args.threads_per_cell or max(1, (os.cpu_count() or 1) // workers)
+    # Imported here, not at the top: it pulls in HippoRAG, which the cells load themselves
+    import experiment
+    memory_budget_gb = args.memory_budget_gb or config.get("memory_budget_gb") or experiment.MEMORY_CEILING_GB
+    memory_ceiling_gb = memory_budget_gb / workers if memory_budget_gb else None
+    launch_dir = Path.cwd()
+    output_dir = Path(args.output_dir or config.get("output_dir", "matrix_runs")).resolve()
+
+    cells = expand_matrix(settings, matrix)
+    validate_settings(cells, experiment.config_names())
+    for i, cell in enumerate(cells):
+        cell["dir"] = str(output_dir / f"cell_{i:03d}")
+    print(f"{len(cells)} cell(s), {workers} worker(s), {threads} thread(s) per cell"
+          + (f", {memory_ceiling_gb:.1f} GB memory ceiling per cell" if memory_ceiling_gb else ""))
+    for cell in cells:
+        print(f"  {Path(cell['dir']).name}: {cell['tag']}")
+    if args.dry_run:
+        return 0
+
+    for cell in cells:
+        cell["settings"] = prepare_cell(cell, Path(cell["dir"]), launch_dir, memory_ceiling_gb)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_cell, cell, Path(cell["dir"]), threads): cell for cell in cells}
+        for future in as_completed(futures):
+            cell = futures[future]
+            cell.update(future.result())
+            status = "ok" if cell["exit_code"] == 0 else f"FAILED (exit {cell['exit_code']}, see {cell['dir']}/{CELL_LOG_FILE})"
+            print(f"[{cell['duration_s']:.0f}s] {cell['tag']}: {status}")
+
+    merged = merge_results(cells)
+    with open(output_dir / MERGED_RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2)
+    with open(output_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump({"workers": workers, "threads_per_cell": threads, "cells": cells}, f, indent=2)
+    print_summary(cells, merged)
+    print(f"\nMerged {len(merged)} step results into {output_dir / MERGED_RESULTS_FILE}")
+    return 0 if all(cell["exit_code"] == 0 for cell in cells) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
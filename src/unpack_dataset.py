@@ -1,10 +1,22 @@
+import argparse
 import json
 import os
+import sys
+import time
 import zipfile
+from multiprocessing import Pool
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Tuple
 
-def process_dataset():
-    zip_path = "test_data/HotpotQA_Dev.zip"
-    output_dir = "HotpotQA_Dev"
+# Add src to python path to allow imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data_classes.documents import process_raw_and_extract_references
+
+ZIP_PATH = "test_data/HotpotQA_Dev.zip"
+OUTPUT_DIR = "HotpotQA_Dev"
+
+def process_dataset(zip_path: str = ZIP_PATH, output_dir: str = OUTPUT_DIR):
     
     if not os.path.exists(zip_path):
         print(f"Error: {zip_path} not found.")
@@ -85,5 +97,133 @@ def process_dataset():
         json.dump(queries, f, indent=2)
     print(f"Saved queries to {queries_path}")
 
+# --- Streaming mode ---
+# Reads members straight from the zip (nothing is extracted), converts documents in a process
+# pool and appends them to JSONL files as they finish, so memory stays flat with corpus size.
+
+_worker_zip: Optional[zipfile.ZipFile] = None
+
+
+def _open_worker_zip(zip_path: str):
+    # Every worker gets its own handle: a ZipFile cannot be shared across processes
+    global _worker_zip
+    _worker_zip = zipfile.ZipFile(zip_path, 'r')
+
+
+def _read_json_member(name: Optional[str]):
+    if name is None:
+        return None
+    try:
+        return json.loads(_worker_zip.read(name).decode('utf-8'))
+    except json.JSONDecodeError:
+        return None
+
+
+def _convert_document(task: Tuple[str, str, Optional[str], Optional[str]]) -> str:
+    """
+    One document folder -> one JSONL line in the `Document.from_dict` format, with
+    the same fields `Document.from_folder` reads, so both give identical documents.
+    """
+    doc_id, raw_name, meta_name, qa_name = task
+    raw_text = _worker_zip.read(raw_name).decode('utf-8')
+    text, references = process_raw_and_extract_references(raw_text)
+    meta = _read_json_member(meta_name) or {}
+    record = {
+        "id": doc_id,
+        "title": meta.get("title"),
+        "author": meta.get("author"),
+        "pub_date": meta.get("pub_date"),
+        "text": text,
+        "references": references,
+        "qa_pairs": _read_json_member(qa_name) or [],
+    }
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _plan_documents(zip_ref: zipfile.ZipFile) -> Tuple[List[Tuple[str, str, Optional[str], Optional[str]]], Optional[str]]:
+    """Group zip members by document folder; returns the conversion tasks and the QA.json member."""
+    folders: Dict[str, Dict[str, str]] = {}
+    qa_member = None
+    for name in zip_ref.namelist():
+        if name.endswith('/'):
+            continue
+        path = PurePosixPath(name)
+        if path.name == "QA.json":
+            # The dataset-level file sits above the document folders; keep the shallowest one
+            if qa_member is None or len(path.parts) < len(PurePosixPath(qa_member).parts):
+                qa_member = name
+            continue
+        files = folders.setdefault(str(path.parent), {})
+        for suffix in ("_raw.txt", "_metadata.json", "_qa.json"):
+            # Prefer <doc_id><suffix>, like the extracting mode, but fall back to any file with the suffix
+            if path.name.endswith(suffix) and (suffix not in files or path.name == f"{path.parent.name}{suffix}"):
+                files[suffix] = name
+
+    tasks = []
+    # Sorted by folder name, the order DataSet and DocumentStream read an extracted folder in
+    for folder in sorted(folders, key=lambda f: PurePosixPath(f).name):
+        files = folders[folder]
+        if "_raw.txt" in files:
+            tasks.append((PurePosixPath(folder).name, files["_raw.txt"], files.get("_metadata.json"), files.get("_qa.json")))
+    return tasks, qa_member
+
+
+def process_dataset_streaming(zip_path: str = ZIP_PATH, output_dir: str = OUTPUT_DIR, workers: Optional[int] = None,
+                              chunksize: int = 64):
+    if not os.path.exists(zip_path):
+        print(f"Error: {zip_path} not found.")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.time()
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        tasks, qa_member = _plan_documents(zip_ref)
+
+        # Process queries
+        queries_path = os.path.join(output_dir, "hotpotqa.jsonl")
+        query_count = 0
+        with open(queries_path, 'w', encoding='utf-8') as f:
+            if qa_member is not None:
+                for q in json.loads(zip_ref.read(qa_member).decode('utf-8')) or []:
+                    f.write(json.dumps({
+                        "id": q.get("question_id"),
+                        "question": q.get("question"),
+                        "answer": q.get("correct_answer"),
+                    }, ensure_ascii=False) + "\n")
+                    query_count += 1
+            else:
+                print(f"Warning: QA.json not found in {zip_path}.")
+        print(f"Saved {query_count} queries to {queries_path}")
+        if qa_member is not None:
+            # Unchanged, next to the corpus: DocumentStream reads dataset-level QA pairs from it like from a folder
+            with open(os.path.join(output_dir, "QA.json"), 'wb') as f:
+                f.write(zip_ref.read(qa_member))
+
+    print(f"Processing {len(tasks)} documents with {workers or os.cpu_count()} workers...")
+    corpus_path = os.path.join(output_dir, "hotpotqa_corpus.jsonl")
+    processed_count = 0
+    with open(corpus_path, 'w', encoding='utf-8') as f, \
+            Pool(processes=workers, initializer=_open_worker_zip, initargs=(zip_path,)) as pool:
+        # imap keeps the folder order and hands back lines as soon as each chunk is done
+        for line in pool.imap(_convert_document, tasks, chunksize=chunksize):
+            f.write(line + "\n")
+            processed_count += 1
+            if processed_count % 10000 == 0:
+                print(f"  Processed {processed_count}/{len(tasks)} documents...", end='\r')
+
+    print(f"\nSaved {processed_count} documents to {corpus_path} in {time.time() - start:.1f}s")
+
+
 if __name__ == "__main__":
-    process_dataset()
+    parser = argparse.ArgumentParser(description="Prepare the HotpotQA corpus and queries from the dataset zip.")
+    parser.add_argument("--zip-path", default=ZIP_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--stream", action="store_true",
+                        help="Read straight from the zip and write JSONL incrementally instead of extracting")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --stream (default: all cores)")
+    args = parser.parse_args()
+
+    if args.stream:
+        process_dataset_streaming(args.zip_path, args.output_dir, args.workers)
+    else:
+        process_dataset(args.zip_path, args.output_dir)